@@ -44,6 +44,7 @@ export FLASK_APP=source/run.py \
 	&& flask db init \
 	&& flask db migrate \
 	&& flask db upgrade \
+	&& flask run-database migrate-anonymous \
 	&& echo 'Database "est.db" - initiated!' \
 	&& deactivate
 
@@ -0,0 +1,464 @@
+# -*- coding: utf-8 -*-
+
+"""
+Script to load identica plugin (local fake Bot API server and simulated
+users to measure identica plugin throughput), kept out of application:
+
+	python scripts/identica_load.py --users 100 --notifications 400
+"""
+
+# Standard libraries import
+import os
+import re
+import sys
+import logging
+import argparse
+import json
+import time
+import random
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse
+from urllib.parse import parse_qs
+
+# Append source path on script execution from project root
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(
+	os.path.abspath(__file__))), 'source'))
+
+# Application modules import
+from plugins import __outbox__
+from plugins import __token__
+from plugins.identica import Plugin as IdenticaPlugin
+from plugins.identica import KEYBOARDS
+from plugins.identica import OUTBOX_WORKERS
+from plugins.identica import GLOBAL_RATE
+from plugins.identica import CHAT_RATE
+
+# Application constants
+FAKE_TOKEN = 'fake'
+FAKE_WEBSITE = 'load.test'
+SEND_METHODS = [
+	'sendMessage', 'answerCallbackQuery', 'sendDocument', 'sendPhoto'
+]
+REPLY_SECONDS = 30 # Simulated user waits for bot reply
+NOTIFY_SECONDS = 300 # Load script waits for all notifications
+NOTIFICATION_TEXT = 'Notification %d'
+PIN_PATTERN = re.compile(r'PIN: <code>(\d+)</code>')
+FLOWS = ['auth_pin', 'auth_url']
+
+
+class FakeBotServer(ThreadingMixIn, HTTPServer):
+	"""
+	This FakeBotServer class describes local stand-in for Bot API
+	(getUpdates, sendMessage, answerCallbackQuery, sendDocument, sendPhoto,
+	setMyCommands and deleteMessage) with injectable latency and error rate.
+	"""
+	daemon_threads = True
+	request_queue_size = 128
+
+	def __init__(self, latency: float, error_rate: float) -> "FakeBotServer":
+		"""
+		Initiate FakeBotServer object on free local port.
+		"""
+		super().__init__(('127.0.0.1', 0), FakeBotHandler)
+		self.latency = latency
+		self.error_rate = error_rate
+		self.condition = threading.Condition()
+		self.updates = []
+		self.update_id = 0
+		self.replies = {}
+		self.calls = {}
+		self.errors = 0
+		self.stopping = False
+
+	def get_url(self) -> str:
+		"""
+		Return Bot API URL template (with %s for bot token).
+		"""
+		return 'http://127.0.0.1:%d/bot%%s/' % self.server_port
+
+	def push_update(self, update: dict) -> None:
+		"""
+		Add update (message or callback_query) from simulated user.
+		"""
+		with self.condition:
+			self.update_id += 1
+			update['update_id'] = self.update_id
+			self.updates.append(update)
+			self.condition.notify_all()
+
+	def get_updates(self, offset: int, timeout: float) -> list:
+		"""
+		Return updates from offset (confirming previous ones)
+		waiting up to timeout seconds (long polling).
+		"""
+		stop_time = time.time() + timeout
+		with self.condition:
+			while True:
+				if offset < 0: # Last update only
+					return self.updates[offset:]
+				self.updates = [
+					update for update in self.updates if update['update_id'] >= offset
+				]
+				if self.updates or self.stopping or time.time() >= stop_time:
+					return self.updates[:100]
+				self.condition.wait(stop_time - time.time())
+
+	def add_reply(self, method: str, data: dict) -> None:
+		"""
+		Add bot reply (method and data) for chat of simulated user.
+		"""
+		with self.condition:
+			self.replies.setdefault(str(data.get('chat_id')), []).append(
+				(time.time(), method, data))
+			self.condition.notify_all()
+
+	def wait_reply(self, chat_id: str, match, timeout: float) -> tuple:
+		"""
+		Wait (up to timeout seconds) for chat reply (time, method, data)
+		matched by function, remove and return it or return null.
+		"""
+		stop_time = time.time() + timeout
+		with self.condition:
+			while True:
+				replies = self.replies.get(str(chat_id), [])
+				for reply in replies:
+					if match(reply[2]):
+						replies.remove(reply)
+						return reply
+				if time.time() >= stop_time:
+					return
+				self.condition.wait(stop_time - time.time())
+
+	def release(self) -> None:
+		"""
+		Release long polling requests (return updates immediately).
+		"""
+		with self.condition:
+			self.stopping = True
+			self.condition.notify_all()
+
+
+class FakeBotHandler(BaseHTTPRequestHandler):
+	"""
+	This FakeBotHandler class describes Bot API request handling
+	(GET or POST with JSON body, query or multipart arguments).
+	"""
+	protocol_version = 'HTTP/1.1'
+	disable_nagle_algorithm = True
+
+	def do_GET(self) -> None:
+		"""
+		Handle Bot API method request.
+		"""
+		server = self.server
+		url = urlparse(self.path)
+		method = url.path.rstrip('/').split('/')[-1]
+		data = { key: value[0] for key, value in parse_qs(url.query).items() }
+		body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+		if self.headers.get('Content-Type', '').startswith('application/json'):
+			data.update(json.loads(body.decode('utf8')))
+		with server.condition:
+			server.calls[method] = server.calls.get(method, 0) + 1
+		if method == 'getUpdates':
+			self.send_json(200, {
+				'ok': True,
+				'result': server.get_updates(
+					int(data.get('offset', 0)), float(data.get('timeout', 0)))
+			})
+			return
+		time.sleep(server.latency)
+		if method in SEND_METHODS and random.random() < server.error_rate:
+			with server.condition:
+				server.errors += 1
+			self.send_json(500, {
+				'ok': False, 'error_code': 500, 'description': 'Injected error'
+			})
+			return
+		if method in SEND_METHODS:
+			server.add_reply(method, data)
+		self.send_json(200, { 'ok': True, 'result': True })
+
+	do_POST = do_GET
+
+	def send_json(self, status: int, data: dict) -> None:
+		"""
+		Send JSON response.
+		"""
+		body = json.dumps(data).encode('utf8')
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format: str, *args) -> None:
+		"""
+		Disable request logging.
+		"""
+		pass
+
+
+class LoadTest():
+	"""
+	This LoadTest class describes load testing of identica plugin
+	(sign-in flows of simulated users and notifications)
+	against local fake Bot API server.
+	"""
+	users = None
+	concurrency = None
+	notifications = None
+	latency = None
+	error_rate = None
+	outbox = None
+
+	def __init__(self, users: int = 100, concurrency: int = 20,
+							 notifications: int = 0, latency: float = 0.05,
+							 error_rate: float = 0.0, workers: int = OUTBOX_WORKERS,
+							 global_rate: float = GLOBAL_RATE,
+							 chat_rate: float = CHAT_RATE) -> "LoadTest":
+		"""
+		Initiate LoadTest object with simulated user number (per flow),
+		concurrency, notification number, fake server latency (seconds)
+		and error rate (share of failed sendings) and outbox settings.
+		"""
+		self.users = users
+		self.concurrency = concurrency
+		self.notifications = notifications
+		self.latency = latency
+		self.error_rate = error_rate
+		self.outbox = {
+			'workers': workers,
+			'global_rate': global_rate,
+			'chat_rate': chat_rate
+		}
+
+	def run(self) -> dict:
+		"""
+		Run load test and return report (by flow: count, completed,
+		seconds, rate and latency percentiles).
+		"""
+		paths = __outbox__.OUTBOX_PATH, __token__.TOKEN_PATH
+		server = FakeBotServer(self.latency, self.error_rate)
+		threading.Thread(target=server.serve_forever, daemon=True).start()
+		with tempfile.TemporaryDirectory() as temp_path:
+			# Isolate outbox and token store from working identica database
+			__outbox__.OUTBOX_PATH = __token__.TOKEN_PATH = \
+				os.path.join(temp_path, 'identica.db')
+			try:
+				identica = IdenticaPlugin(config=self.get_config(server.get_url()))
+				bot = threading.Thread(target=identica.run, daemon=True)
+				bot.start()
+				report = {}
+				for flow in FLOWS:
+					report[flow] = self.run_users(server, flow)
+				if self.notifications:
+					report['notify'] = self.run_notifications(server)
+				identica.stop()
+				server.release()
+				bot.join() # Replies and outbox are drained on stop
+			finally:
+				__outbox__.OUTBOX_PATH, __token__.TOKEN_PATH = paths
+				server.shutdown()
+				server.server_close()
+		report['calls'] = server.calls
+		report['errors'] = server.errors
+		print_report(report)
+		return report
+
+	def get_config(self, bot_url: str) -> dict:
+		"""
+		Return identica configuration for fake server.
+		"""
+		return {
+			'name': 'identica',
+			'website': FAKE_WEBSITE,
+			'token': FAKE_TOKEN,
+			'auth_url': 'https://%s/account/identica/%%s/' % FAKE_WEBSITE,
+			'bot_url': dict(
+				{
+					method: bot_url + method for method in [
+						'setMyCommands', 'getUpdates', 'sendMessage', 'deleteMessage',
+						'answerCallbackQuery', 'sendDocument', 'sendPhoto'
+					]
+				},
+				getUpdatesArguments='?offset=%d&timeout=%d'
+			),
+			'outbox': self.outbox
+		}
+
+	def run_users(self, server: FakeBotServer, flow: str) -> dict:
+		"""
+		Run flow for simulated users concurrently and return flow report.
+		"""
+		started = time.time()
+		with ThreadPoolExecutor(self.concurrency) as executor:
+			latencies = list(executor.map(
+				lambda user_id: run_user(server, flow, user_id),
+				range(1, self.users + 1)
+			))
+		return get_report(latencies, time.time() - started)
+
+	def run_notifications(self, server: FakeBotServer) -> dict:
+		"""
+		Enqueue notifications (through outbox) for simulated users,
+		wait for delivery and return report.
+		"""
+		started = time.time()
+		enqueued = []
+		for index in range(self.notifications):
+			enqueued.append(time.time())
+			IdenticaPlugin.notify_user(
+				str(index % self.users + 1), NOTIFICATION_TEXT % index)
+		latencies = [None] * self.notifications
+		for index in range(self.notifications):
+			text = NOTIFICATION_TEXT % index
+			reply = server.wait_reply(
+				str(index % self.users + 1),
+				lambda data: data.get('text') == text,
+				max(0, started + NOTIFY_SECONDS - time.time())
+			)
+			if reply is not None:
+				latencies[index] = reply[0] - enqueued[index]
+		return get_report(latencies, time.time() - started)
+
+
+def run_user(server: FakeBotServer, flow: str, user_id: int) -> float:
+	"""
+	Run sign-in flow (auth_pin or auth_url) for simulated user
+	and return latency (request to sign-in) or return null on failure.
+	"""
+	user = {
+		'id': user_id,
+		'is_bot': False,
+		'first_name': 'User',
+		'last_name': str(user_id),
+		'username': 'user%d' % user_id,
+		'language_code': 'en'
+	}
+	marker = '[ %s ]' % FAKE_WEBSITE
+	title = [
+		button[0]['title']['en'] for button in KEYBOARDS[0]
+		if button[0]['id'] == '/' + flow
+	][0]
+	started = time.time()
+	server.push_update({
+		'message': {
+			'message_id': user_id,
+			'from': user,
+			'chat': { 'id': user_id },
+			'text': '%s\n%s' % (title, marker)
+		}
+	})
+	if flow == 'auth_url':
+		reply = server.wait_reply(
+			user_id, lambda data: has_button(data, 'url'), REPLY_SECONDS)
+		if reply is None:
+			return
+		url = reply[2]['reply_markup']['inline_keyboard'][0][0]['url']
+		verify_data = IdenticaPlugin.verify_url(url.rstrip('/').split('/')[-1])
+		return time.time() - started if verify_data else None
+	reply = server.wait_reply(
+		user_id, lambda data: PIN_PATTERN.match(data.get('text', '')),
+		REPLY_SECONDS)
+	if reply is None:
+		return
+	pin = PIN_PATTERN.match(reply[2]['text']).group(1)
+	reply = server.wait_reply(
+		user_id, lambda data: has_button(data, 'callback_data'), REPLY_SECONDS)
+	password = IdenticaPlugin.get_password(pin) # Shown on sign-in page
+	if reply is None or password is None:
+		return
+	for button in reply[2]['reply_markup']['inline_keyboard']:
+		if button[0]['text'] == password:
+			server.push_update({
+				'callback_query': {
+					'id': str(user_id),
+					'from': user,
+					'message': { 'chat': { 'id': user_id } },
+					'data': button[0]['callback_data']
+				}
+			})
+	if not IdenticaPlugin.wait_pin(pin, REPLY_SECONDS):
+		return
+	verify_data = IdenticaPlugin.verify_pin(pin)
+	return time.time() - started if verify_data else None
+
+
+def has_button(data: dict, field: str) -> bool:
+	"""
+	Return True if message data has inline keyboard button with field.
+	"""
+	keyboard = data.get('reply_markup', {}).get('inline_keyboard', [])
+	return bool(keyboard) and field in keyboard[0][0]
+
+
+def get_report(latencies: list, seconds: float) -> dict:
+	"""
+	Return report (count, completed, seconds, completion rate
+	and latency percentiles) for latencies (null for failures).
+	"""
+	completed = sorted(latency for latency in latencies if latency is not None)
+	return {
+		'count': len(latencies),
+		'completed': len(completed),
+		'seconds': seconds,
+		'rate': len(completed) / max(seconds, 0.001),
+		'p50': get_percentile(completed, 50),
+		'p99': get_percentile(completed, 99)
+	}
+
+
+def get_percentile(values: list, percentile: int) -> float:
+	"""
+	Return percentile of sorted values (nearest rank) or return null.
+	"""
+	if not values:
+		return
+	return values[max(0, -(-len(values) * percentile // 100) - 1)]
+
+
+def print_report(report: dict) -> None:
+	"""
+	Print load report by flows and fake server call numbers.
+	"""
+	for flow in FLOWS + ['notify']:
+		if flow in report:
+			item = report[flow]
+			print(
+				'%-8s %6d/%-6d completed in %8.2fs (%.1f/sec), '
+				'p50 %.3fs, p99 %.3fs' % (
+					flow, item['completed'], item['count'], item['seconds'],
+					item['rate'], item['p50'] or 0, item['p99'] or 0
+				)
+			)
+	print('Bot API calls: %s, injected errors: %d' % (
+		json.dumps(report['calls'], sort_keys=True), report['errors']))
+
+
+# Run load test on executing script
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Load identica plugin '
+		'against fake Bot API server.')
+	parser.add_argument('--users', type=int, default=100,
+		help='Simulated users per flow.')
+	parser.add_argument('--concurrency', type=int, default=20,
+		help='Users running concurrently.')
+	parser.add_argument('--notifications', type=int, default=0,
+		help='Notifications sent.')
+	parser.add_argument('--latency', type=float, default=0.05,
+		help='Fake Bot API latency (sec).')
+	parser.add_argument('--error-rate', type=float, default=0.0,
+		help='Share of fake Bot API sendings failed.')
+	parser.add_argument('--workers', type=int, default=OUTBOX_WORKERS,
+		help='Outbox workers.')
+	parser.add_argument('--global-rate', type=float, default=float(GLOBAL_RATE),
+		help='Messages per second (0 - no limit).')
+	parser.add_argument('--chat-rate', type=float, default=float(CHAT_RATE),
+		help='Messages per second for chat (0 - no limit).')
+	logging.getLogger().level = logging.WARNING
+	LoadTest(**vars(parser.parse_args())).run()
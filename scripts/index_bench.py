@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+"""
+Script to benchmark database index plan (write and read latency of store
+queries on generated SQLite database), kept out of application:
+
+	python scripts/index_bench.py
+	python scripts/index_bench.py --legacy-indexes # Per-column indexes
+"""
+
+# Standard libraries import
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+import tempfile
+import datetime
+
+# Append source path on script execution from project root
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(
+	os.path.abspath(__file__))), 'source'))
+
+# Application modules import
+from blueprints import application
+from models import database
+from models.entity.test import Test
+from models.entity.process import Process
+from models.entity.task import Task
+from models.process_store import ProcessStore
+
+# Application constants
+BENCH_TABLES = ['name', 'process', 'task', 'test', 'user']
+LEGACY_INDEXES = { # Per-column indexes replaced by composite ones
+	'name': ['user_id', 'value'],
+	'process': [
+		'anonymous_token', 'answer_count', 'answer_time', 'correct_count',
+		'limit_time', 'modified_local', 'name_uid', 'test_id', 'user_uid'
+	],
+	'task': ['answer', 'correct_answer', 'data', 'process_id'],
+	'test': ['answer_count', 'extension', 'extension_options', 'name', 'user_uid'],
+	'user': [
+		'from_id', 'name', 'notification_profile',
+		'notification_test_complete', 'notification_test_start'
+	]
+}
+USER_COUNT = 200
+READ_COUNT = 2000
+ANSWER_COUNT = 1000
+PLAYER_COUNT = 1000
+HISTORY_COUNT = 300
+
+
+def populate(connection, tests: int, processes: int, tasks: int) -> None:
+	"""
+	Insert tests, completed processes (tasks per process) and tasks.
+	"""
+	now = datetime.datetime.utcnow()
+	get_time = lambda seconds: (now - datetime.timedelta(seconds=seconds)) \
+		.strftime('%Y-%m-%d %H:%M:%S.%f')
+	connection.executemany(
+		'INSERT INTO test (id, uid, created_utc, modified_utc, name, extension, '
+		'extension_options, answer_count, user_uid) '
+		'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+		[
+			(
+				index + 1, str(uuid.uuid4()), get_time(index), get_time(index),
+				'Test %d' % index, 'arithmetic', '{}', tasks, 'user%d' % (index % 5)
+			) for index in range(tests)
+		]
+	)
+	connection.executemany(
+		'INSERT INTO process (id, uid, created_utc, modified_utc, test_id, '
+		'answer_count, correct_count, limit_time, answer_time, user_uid, '
+		'modified_local) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+		[
+			(
+				index + 1, str(uuid.uuid4()), get_time(index), get_time(index),
+				index % tests + 1, tasks, tasks // 2, 60, 50,
+				'user%d' % (index % USER_COUNT), get_time(index)
+			) for index in range(processes)
+		]
+	)
+	connection.executemany(
+		'INSERT INTO task (id, uid, created_utc, modified_utc, process_id, '
+		'data, answer, correct_answer) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+		[
+			(
+				index + 1, str(uuid.uuid4()), get_time(index), get_time(index),
+				index // tasks + 1,
+				json.dumps({ 'question': 'x' * 80, 'answer': str(index) }),
+				str(index), True
+			) for index in range(processes * tasks)
+		]
+	)
+	connection.commit()
+
+
+def use_legacy_indexes(connection) -> None:
+	"""
+	Replace indexes of benchmarked tables with legacy per-column ones.
+	"""
+	for table in BENCH_TABLES:
+		for index_name, in connection.execute(
+					"SELECT name FROM sqlite_master WHERE type = 'index' "
+					"AND tbl_name = ? AND sql IS NOT NULL", (table,)
+				).fetchall():
+			connection.execute('DROP INDEX "%s"' % index_name)
+		for column in LEGACY_INDEXES[table]:
+			connection.execute('CREATE INDEX "ix_%s_%s" ON "%s" ("%s")' % (
+				table, column, table, column))
+	connection.commit()
+
+
+def measure(name: str, count: int, function) -> float:
+	"""
+	Call function count times (with call index), print and return
+	average latency (milliseconds).
+	"""
+	started = time.perf_counter()
+	for index in range(count):
+		function(index)
+	latency = (time.perf_counter() - started) * 1000 / count
+	print('%-28s %8.3f ms/op' % (name, latency))
+	return latency
+
+
+def answer(process_uids: list) -> None:
+	"""
+	Store answer as player does (read process, insert answered task
+	and update process counters within one commit).
+	"""
+	process = ProcessStore.read(random.choice(process_uids))
+	task = Task(process.id, json.dumps({ 'question': 'y' * 80, 'answer': '1' }))
+	database.session.add(task)
+	database.session.flush()
+	task.answer = '1'
+	task.correct_answer = True
+	task.set_modified()
+	process.answer_count += 1
+	process.correct_count += 1
+	process.answer_time += 3
+	process.limit_time += 6
+	process.set_modified()
+	database.session.commit()
+
+
+def run(tests: int, processes: int, tasks: int, legacy_indexes: bool) -> dict:
+	"""
+	Run benchmark on temporary database and return report
+	(latency by query and database size).
+	"""
+	random.seed(1)
+	with tempfile.TemporaryDirectory() as temp_path:
+		database_path = os.path.join(temp_path, 'est.db')
+		application.config['SQLALCHEMY_DATABASE_URI'] = \
+			'sqlite:///' + database_path
+		with application.app_context():
+			database.create_all()
+			connection = database.engine.raw_connection()
+			populate(connection, tests, processes, tasks)
+			if legacy_indexes:
+				use_legacy_indexes(connection)
+			connection.close()
+			process_uids = [uid for uid, in database.session.query(Process.uid)]
+			test_uids = [uid for uid, in database.session.query(Test.uid)]
+			report = {
+				'read by uid': measure('read by uid', READ_COUNT,
+					lambda index: ProcessStore.read(random.choice(process_uids))),
+				'answer write+commit': measure('answer write+commit', ANSWER_COUNT,
+					lambda index: answer(process_uids)),
+				'player state': measure('player state', PLAYER_COUNT,
+					lambda index: ProcessStore.read_player_state(
+						random.choice(process_uids))),
+				'history page': measure('history page', HISTORY_COUNT,
+					lambda index: ProcessStore.read_page(
+						0, 12, random.choice(test_uids), False,
+						'user%d' % (index % USER_COUNT), None, None))
+			}
+			database.session.remove()
+			database.engine.dispose()
+		report['database size'] = os.path.getsize(database_path) / 2 ** 20
+		print('%-28s %8.1f MB' % ('database size', report['database size']))
+	return report
+
+
+# Run benchmark on executing script
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark database index '
+		'plan on generated SQLite database.')
+	parser.add_argument('--tests', type=int, default=50, help='Tests.')
+	parser.add_argument('--processes', type=int, default=20000,
+		help='Completed processes.')
+	parser.add_argument('--tasks', type=int, default=10,
+		help='Tasks per process.')
+	parser.add_argument('--legacy-indexes', action='store_true',
+		help='Replace indexes with legacy per-column ones (before).')
+	logging.getLogger().level = logging.WARNING
+	run(**vars(parser.parse_args()))
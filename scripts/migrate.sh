@@ -11,4 +11,6 @@ export FLASK_APP=source/run.py \
 flask db migrate \
 	&& flask db upgrade \
 	&& echo 'Database "est.db" - migrated!' \
+	&& flask run-database migrate-anonymous \
+	&& echo 'Anonymous (legacy tokens) - migrated, rating (rollup) - rebuilt!' \
 	&& deactivate
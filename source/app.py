@@ -19,8 +19,12 @@ sys.path.append('source')
 # Application modules import
 from blueprints import application
 from models import database
+from models.process_store import ProcessStore
+from models.rating_store import RatingStore
+from models.anonymous_store import AnonymousStore
 from config import CONFIG
 from plugins import PluginManager
+from plugins.database import FORMATS
 
 # Additional flask cli commands
 database_cli = AppGroup('run-database')
@@ -37,7 +41,16 @@ def run_identica():
 
 @database_cli.command('export')
 @click.argument('tables')
-def run_database_export(tables: str):
+@click.option('--chunk-size', default=1000, help='Rows fetched per chunk.')
+@click.option('--incremental', is_flag=True,
+	help='Export rows modified (and uids of rows hard deleted) since '
+		'stored watermark to delta files only.')
+@click.option('--workers', default=1,
+	help='Files written concurrently with reading (one snapshot).')
+@click.option('--format', 'file_format', default=FORMATS[0],
+	type=click.Choice(FORMATS), help='Export file format.')
+def run_database_export(tables: str, chunk_size: int, incremental: bool,
+												workers: int, file_format: str):
 	"""
 	Run PluginManager to export database tables.
 	"""
@@ -46,25 +59,107 @@ def run_database_export(tables: str):
 		'database',
 		target_path=os.path.join(
 			os.path.dirname(os.path.dirname(__file__)), 'csv'),
-		table_list=tables.split(',')
+		table_list=tables.split(','),
+		chunk_size=chunk_size,
+		incremental=incremental,
+		workers=workers,
+		file_format=file_format
 	).execute('export_csv')
 
 
 @database_cli.command('import')
 @click.argument('tables')
-def run_database_import(tables: str):
+@click.option('--chunk-size', default=1000, help='Rows inserted per commit.')
+@click.option('--bulk', is_flag=True,
+	help='Defer indexes and relax pragmas (SQLite) while importing.')
+@click.option('--incremental', is_flag=True,
+	help='Delete rows of tombstones files and upsert rows by uid '
+		'from delta files (database should be replica).')
+@click.option('--workers', default=1,
+	help='Files read ahead concurrently with writing (one connection).')
+@click.option('--format', 'file_format', default=FORMATS[0],
+	type=click.Choice(FORMATS), help='Import file format.')
+def run_database_import(tables: str, chunk_size: int, bulk: bool,
+												incremental: bool, workers: int, file_format: str):
 	"""
-	Run PluginManager to import database tables.
+	Run PluginManager to import database tables
+	(interrupted import is resumed after last committed chunk).
 	"""
 	logging.getLogger().level = logging.INFO
 	PluginManager(
 		'database',
 		target_path=os.path.join(
 			os.path.dirname(os.path.dirname(__file__)), 'csv'),
-		table_list=tables.split(',')
+		table_list=tables.split(','),
+		chunk_size=chunk_size,
+		bulk=bulk,
+		incremental=incremental,
+		workers=workers,
+		file_format=file_format
 	).execute('import_csv')
 
 
+@database_cli.command('snapshot')
+@click.argument('filename')
+def run_database_snapshot(filename: str):
+	"""
+	Run PluginManager to save online database snapshot (SQLite).
+	"""
+	logging.getLogger().level = logging.INFO
+	PluginManager(
+		'database',
+		target_path=os.path.join(
+			os.path.dirname(os.path.dirname(__file__)), 'backup')
+	).execute('snapshot', filename=filename)
+
+
+@database_cli.command('restore')
+@click.argument('filename')
+def run_database_restore(filename: str):
+	"""
+	Run PluginManager to restore database from snapshot (SQLite,
+	application should be stopped before).
+	"""
+	logging.getLogger().level = logging.INFO
+	PluginManager(
+		'database',
+		target_path=os.path.join(
+			os.path.dirname(os.path.dirname(__file__)), 'backup')
+	).execute('restore', filename=filename)
+
+
+@database_cli.command('backfill-scores')
+def run_database_backfill_scores():
+	"""
+	Backfill result and crammers of completed processes.
+	"""
+	logging.getLogger().level = logging.INFO
+	print('Scores backfilled for %d processes' % ProcessStore.backfill_scores())
+
+
+@database_cli.command('rebuild-rating')
+def run_database_rebuild_rating():
+	"""
+	Rebuild rating (daily crammers rollup) from completed processes
+	(scores are backfilled first).
+	"""
+	logging.getLogger().level = logging.INFO
+	print('Scores backfilled for %d processes' % ProcessStore.backfill_scores())
+	print('Rating rebuilt from %d processes' % RatingStore.rebuild())
+
+
+@database_cli.command('migrate-anonymous')
+def run_database_migrate_anonymous():
+	"""
+	Migrate processes from legacy anonymous tokens to anonymous ids
+	and rebuild rating.
+	"""
+	logging.getLogger().level = logging.INFO
+	print('Anonymous migrated for %d processes' % AnonymousStore.migrate())
+	print('Scores backfilled for %d processes' % ProcessStore.backfill_scores())
+	print('Rating rebuilt from %d processes' % RatingStore.rebuild())
+
+
 # Add additional flask cli commands
 application.cli.add_command(database_cli)
 
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""
+Helper module to handle extension registry (modules loaded on startup)
+and cache of loaded test options.
+"""
+
+# Standard libraries import
+import json
+import logging
+import importlib
+import threading
+from types import MappingProxyType
+from collections import OrderedDict
+
+# Application modules import
+from config import EXTENSION_LIST
+
+# Application constants
+INTERFACE_VERSION = 1 # Extensions should declare the same version
+INTERFACE_FUNCTIONS = [
+	'parse_options', 'form_options', 'validate_answer', 'get_data'
+]
+OPTIONS_CACHE_SIZE = 1024
+
+
+class Extension():
+	"""
+	This Extension class describes registered extension (loaded module,
+	options metadata with valid values and declared interface version).
+	"""
+
+	def __init__(self, name: str, module: object) -> "Extension":
+		"""
+		Initiate Extension object with name and loaded module.
+		"""
+		self.name = name
+		self.module = module
+		self.options = module.options
+		self.interface_version = getattr(module, 'INTERFACE_VERSION', None)
+		self.valid_values = {
+			option['name']: [choice[0] for choice in option['choices']]
+			for option in self.options
+		}
+
+	def load_options(self, extension_options: str) -> MappingProxyType:
+		"""
+		Load (JSON) and validate (values by options) and return read-only
+		options dictionary or raise ValueError.
+		"""
+		try:
+			values = json.loads(extension_options)
+		except TypeError:
+			raise ValueError('Not valid data.')
+		if not isinstance(values, dict):
+			raise ValueError('Not valid data.')
+		for name, valid_values in self.valid_values.items():
+			if values.get(name) not in valid_values:
+				raise ValueError('Not valid data.')
+		return MappingProxyType(values)
+
+
+def load_extensions() -> dict:
+	"""
+	Load extension modules and return registry (extension by name)
+	skipping extensions with other interface version or functions missed.
+	"""
+	extensions = {}
+	for name in EXTENSION_LIST:
+		try:
+			extension = Extension(
+				name, importlib.import_module('extensions.%s' % name))
+		except:
+			logging.error('Extension import error: %s' % name, exc_info=1)
+			continue
+		if extension.interface_version != INTERFACE_VERSION:
+			logging.error('Extension interface version mismatch: %s (%s)' % (
+				name, extension.interface_version))
+			continue
+		missed = [
+			function for function in INTERFACE_FUNCTIONS
+			if not callable(getattr(extension.module, function, None))
+		]
+		if missed:
+			logging.error('Extension functions missed: %s (%s)' % (
+				name, ', '.join(missed)))
+			continue
+		extensions[name] = extension
+	return extensions
+
+
+EXTENSIONS = load_extensions()
+_options_cache = OrderedDict()
+_options_lock = threading.Lock()
+
+
+def get_extension(name: str) -> Extension:
+	"""
+	Return registered extension or return null.
+	"""
+	return EXTENSIONS.get(name)
+
+
+def get_extension_module(name: str) -> object:
+	"""
+	Return registered extension module or return null.
+	"""
+	extension = EXTENSIONS.get(name)
+	return extension.module if extension is not None else None
+
+
+def get_test_options(test: object) -> MappingProxyType:
+	"""
+	Return loaded and validated (read-only) test options cached
+	by test uid and modified time (least recently used are evicted)
+	or return null if extension is not registered or options are not valid.
+	"""
+	key = (test.uid, test.modified_utc)
+	with _options_lock:
+		options = _options_cache.get(key)
+		if options is not None:
+			_options_cache.move_to_end(key)
+			return options
+	extension = EXTENSIONS.get(test.extension)
+	if extension is None:
+		logging.error('Extension not registered: %s' % test.extension)
+		return
+	try:
+		options = extension.load_options(test.extension_options)
+	except ValueError:
+		logging.error('Test options not valid: %s' % test.uid)
+		return
+	with _options_lock:
+		_options_cache[key] = options
+		_options_cache.move_to_end(key)
+		while len(_options_cache) > OPTIONS_CACHE_SIZE:
+			_options_cache.popitem(last=False)
+	return options
@@ -7,30 +7,46 @@ Helper module to handle pagination.
 # Additional libraries import
 from flask import request
 from blueprints.__args__ import get_integer
+from blueprints.__args__ import get_string
 from blueprints.__args__ import set_value
+from models.__base__ import Store
+from models.__base__ import CURSOR_NEXT
+from models.__base__ import CURSOR_PREV
 
 
-def get_pagination(prefix: str, entity_count: int,
-									 default_per_page: int = 12) -> dict:
+def get_pagination(prefix: str, read_page,
+									 default_per_page: int = 12) -> (dict, list):
 	"""
-	Return dictionary with page_index, per_page, page_count
-	and entity_count values.
+	Return dictionary with page_index, per_page, page_count,
+	entity_count and cursor (keyset pagination) values
+	and list of entities read by read_page(offset, limit, cursor) function
+	(it should return entities with total entity count).
 	"""
 	# Set prefix names
 	prefix_page_index = '%sPageIndex' % prefix
 	prefix_per_page = '%sPerPage' % prefix
-	# Get page_index and per_page from request
+	prefix_cursor = '%sCursor' % prefix
+	# Get page_index, per_page and cursor from request
 	page_index = get_integer(prefix_page_index, 1)
 	per_page = get_integer(prefix_per_page, default_per_page)
-	# Calculate page_count
-	page_count = entity_count / per_page
-	page_count = int(page_count) + 1 \
-		if int(page_count) < page_count else int(page_count)
+	cursor = get_string(prefix_cursor)
 	# Check page_index and per_page validity
-	if (page_index < 1 or page_index > page_count) and page_index != 1:
-		 page_index = 1
+	if page_index < 1:
+		page_index = 1
+		cursor = None
 	if per_page < 1:
 		per_page = 1
+		cursor = None
+	# Read entities with entity_count and calculate page_count
+	entities, entity_count = \
+		read_page((page_index - 1) * per_page, per_page, cursor)
+	page_count = entity_count / per_page
+	page_count = int(page_count) + 1 \
+		if int(page_count) < page_count else int(page_count)
+	if page_index > page_count and page_index != 1:
+		page_index = 1
+		cursor = None
+		entities, entity_count = read_page(0, per_page, cursor)
 	# Store arguments in session
 	set_value(prefix_page_index, page_index)
 	set_value(prefix_per_page, per_page)
@@ -38,5 +54,18 @@ def get_pagination(prefix: str, entity_count: int,
 		"page_index": page_index,
 		"per_page": per_page,
 		"page_count": page_count,
-		"entity_count": entity_count
-	}
+		"entity_count": entity_count,
+		"cursor": cursor
+	}, entities
+
+
+def set_cursors(pagination: dict, entities: list) -> dict:
+	"""
+	Set previous and next page cursors by first and last page entities
+	and return pagination dictionary.
+	"""
+	pagination['prev_cursor'] = \
+		Store.get_cursor(entities[0], CURSOR_PREV) if entities else None
+	pagination['next_cursor'] = \
+		Store.get_cursor(entities[-1], CURSOR_NEXT) if entities else None
+	return pagination
@@ -5,7 +5,6 @@ Blueprint module to handle account routes.
 """
 
 # Standard libraries import
-import secrets
 import logging
 import datetime
 
@@ -15,6 +14,7 @@ from blueprints.base import blueprint
 from blueprints.__locale__ import __
 from plugins.identica import Plugin as IdenticaPlugin
 from models.process_store import ProcessStore
+from models.anonymous_store import AnonymousStore
 from models.user_store import UserStore
 from models.name_store import NameStore
 from models.entity.user import User
@@ -28,10 +28,13 @@ from flask_login import login_user
 from flask_login import logout_user
 from flask_login import current_user
 from flask import session
+from flask import g
 from flask import request
 from flask import redirect
 from flask import url_for
 from flask import render_template
+from flask import Response
+from flask import stream_with_context
 from flask_wtf import FlaskForm
 from wtforms import StringField
 from wtforms import SelectField
@@ -41,6 +44,9 @@ from wtforms import validators
 # Constants
 PROFILE_TEMPLATE = 'EVENT: %s'
 LINK_TEMPLATE = 'https://t.me/user?id=%s'
+SIGN_IN_PIN = 'sign_in_pin'
+EVENTS_SECONDS = 3 # Sign-in event stream heartbeat (closed client is detected)
+EVENTS_RETRY_SECONDS = 0 # Browser reopens dropped stream after
 
 
 class GlobalUser():
@@ -78,9 +84,9 @@ class SignedInUser(UserMixin, GlobalUser):
 		if self.user is not None:
 			return self.user.uid
 
-	def get_token(self):
+	def get_anonymous_id(self, create: bool = False):
 		"""
-		Return None for SignedInUser object (no anonymous token).
+		Return None for SignedInUser object (no anonymous id).
 		"""
 		return None
 
@@ -105,15 +111,27 @@ class AnonymousUser(AnonymousUserMixin, GlobalUser):
 		"""
 		return None
 
-	def get_token(self):
+	def get_anonymous_id(self, create: bool = False):
 		"""
-		Return anonymous token for anonymous user.
+		Return anonymous id for anonymous user (session keeps anonymous uid,
+		legacy session token is exchanged for anonymous on first request)
+		or return None if there is no anonymous (it is created on create only).
 		"""
-		anonymous_token = session.get('anonymous_token')
-		if anonymous_token is None:
-			anonymous_token = secrets.token_hex(256)
-			session['anonymous_token'] = anonymous_token
-		return anonymous_token
+		if g.get('anonymous_id') is None:
+			anonymous = None
+			legacy_token = session.get('anonymous_token')
+			if session.get('anonymous') is not None:
+				anonymous = AnonymousStore.read(session['anonymous'])
+			elif legacy_token is not None:
+				anonymous = AnonymousStore.read_by_legacy_token(legacy_token)
+			if anonymous is None:
+				if not create:
+					return None
+				anonymous = AnonymousStore.create(legacy_token)
+			session.pop('anonymous_token', None)
+			session['anonymous'] = anonymous.uid
+			g.anonymous_id = anonymous.id
+		return g.anonymous_id
 
 	def get_name(self):
 		"""
@@ -178,6 +196,7 @@ def sign_in():
 					sign_in.pin.errors = [ __('Wrong PIN') ]
 				else:
 					sign_in.password.data = password
+					session[SIGN_IN_PIN] = sign_in.pin.data
 			else:
 				verify_data = IdenticaPlugin.verify_pin(sign_in.pin.data)
 				if verify_data is None:
@@ -192,7 +211,9 @@ def sign_in():
 							verify_data['from'].get('username')
 						)
 					)
-					ProcessStore.bind_token(user.uid, current_user.get_token())
+					ProcessStore.bind_anonymous(
+						user.uid, current_user.get_anonymous_id())
+					session.pop(SIGN_IN_PIN, None)
 					login_user(SignedInUser(user), remember=True)
 					user_info = '%s (%s)' % \
 						(
@@ -207,6 +228,38 @@ def sign_in():
 	)
 
 
+@blueprint.route('/account/sign-in/events/', methods=('GET',))
+def sign_in_events():
+	"""
+	Return event stream to push PIN confirmation (confirmed or invalid
+	event) to sign-in page instead of polling (stream is kept until PIN
+	is confirmed or expired and holds sync worker up to PIN lifetime,
+	heartbeat comment is sent every EVENTS_SECONDS to stop on closed client).
+	"""
+	pin = session.get(SIGN_IN_PIN)
+
+	def generate_events():
+		yield 'retry: %d\n\n' % (EVENTS_RETRY_SECONDS * 1000)
+		confirmed = None if pin is None else False
+		while confirmed is False:
+			confirmed = IdenticaPlugin.wait_pin(pin, EVENTS_SECONDS)
+			if confirmed is False:
+				yield ':\n\n' # Write fails (and ends stream) on closed client
+		if confirmed:
+			yield 'event: confirmed\ndata: {}\n\n'
+		else:
+			yield 'event: invalid\ndata: {}\n\n'
+
+	return Response(
+		stream_with_context(generate_events()),
+		mimetype='text/event-stream',
+		headers={
+			'Cache-Control': 'no-cache',
+			'X-Accel-Buffering': 'no' # Disable proxy buffering
+		}
+	)
+
+
 @blueprint.route('/account/identica/<url_token>/', methods=('GET',))
 def authenticate_identica(url_token: str):
 	"""
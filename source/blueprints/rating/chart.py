@@ -17,7 +17,6 @@ from blueprints.__locale__ import __
 from models.process_store import ProcessStore
 from models.entity.process import Process
 from config import EXTENSION_LIST
-from blueprints.testing.player import get_crammers_expression
 
 # Additional libraries import
 from flask import render_template
@@ -47,11 +46,15 @@ def get_chart(criteria: str = CRITERIAS[0], extension: str = ALL_EXTENSIONS):
 		datetime.timedelta(minutes=session['timezone_offset'])
 	until = until.replace(hour=0, minute=0, second=0, microsecond=0)
 	since = until - datetime.timedelta(days=30)
-	chart_data = ProcessStore.get_chart_data(
-		None if extension == ALL_EXTENSIONS else extension,
-		current_user.get_id(), current_user.get_token(),
-		None, get_crammers_expression(), since, until
-	)
+	anonymous_id = current_user.get_anonymous_id()
+	if current_user.is_authenticated or anonymous_id is not None:
+		chart_data = ProcessStore.get_chart_data(
+			None if extension == ALL_EXTENSIONS else extension,
+			current_user.get_id(), anonymous_id,
+			None, since, until
+		)
+	else:
+		chart_data = [] # Anonymous without id has no processes yet
 	days = []
 	date_index_dict = {}
 	for day in range(30):
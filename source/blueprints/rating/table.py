@@ -18,7 +18,6 @@ from blueprints.__locale__ import __
 from models.process_store import ProcessStore
 from models.test_store import TestStore
 from models.entity.process import Process
-from blueprints.testing.player import get_crammers_expression
 from config import EXTENSION_LIST
 
 # Additional libraries import
@@ -59,7 +58,7 @@ def get_top(period: str = ALL_PERIODS, extension: str = ALL_EXTENSIONS):
 		since = until - datetime.timedelta(days=1)
 	top_crammers = ProcessStore.get_top_crammers(
 		0, 10, None if extension == ALL_EXTENSIONS else extension,
-		None, None, None, get_crammers_expression(), since, until
+		None, None, None, since, until
 	)
 	info_page = None
 	user_crammers = None
@@ -72,8 +71,7 @@ def get_top(period: str = ALL_PERIODS, extension: str = ALL_EXTENSIONS):
 		try:
 			user_crammers = ProcessStore.get_user_crammers(
 				None if extension == ALL_EXTENSIONS else extension,
-				None, None, current_user.get_name().uid,
-				get_crammers_expression(), since, until
+				None, None, current_user.get_name().uid, since, until
 			)
 		except Exception as exc:
 			logging.error(getattr(exc, 'message', repr(exc)))
@@ -5,7 +5,6 @@ Blueprint module to handle test catalog routes.
 """
 
 # Standard libraries import
-import importlib
 import logging
 
 # Application modules import
@@ -13,8 +12,10 @@ from blueprints import application
 from blueprints.testing import blueprint
 from blueprints.__locale__ import __
 from blueprints.__pagination__ import get_pagination
+from blueprints.__pagination__ import set_cursors
 from blueprints.__args__ import get_boolean
 from blueprints.__args__ import get_string
+from blueprints.__extensions__ import get_extension_module
 from config import EXTENSION_LIST
 from models.test_store import TestStore
 from models.entity.test import Test
@@ -145,27 +146,29 @@ def get_catalog(extension: str = ALL_EXTENSIONS):
 	# Prepare list data
 	filter_hide_global = filters[0]['value'] \
 		if current_user.is_authenticated else None
-	pagination = get_pagination(
+	pagination, tests = get_pagination(
 		'catalog',
-		 TestStore.count_list(
+		lambda offset, limit, cursor: TestStore.read_page(
+			offset, limit,
 			None, None if extension == ALL_EXTENSIONS else extension,
 			current_user.get_id(),
-			current_user.get_admin_uid_list() if not filter_hide_global else []
+			current_user.get_admin_uid_list() if not filter_hide_global else [],
+			cursor
 		)
 	)
 	pagination['endpoint'] = 'testing.get_catalog'
 	pagination['pre_kwargs'] = {}
 	pagination['prefix'] = 'catalog'
-	tests =  TestStore.read_list(
-		(pagination['page_index'] - 1) * pagination['per_page'],
-		pagination['per_page'],
-		None, None if extension == ALL_EXTENSIONS else extension,
-		current_user.get_id(),
-		current_user.get_admin_uid_list() if not filter_hide_global else []
-	)
+	set_cursors(pagination, tests)
+	random_kwargs = {}
+	if extension != ALL_EXTENSIONS:
+		random_kwargs['extension'] = extension
+	if filter_hide_global:
+		random_kwargs['filterCatalogHideGlobal'] = True
 	return render_template(
 		'testing/catalog.html',
 		filters=filters,
+		random_kwargs=random_kwargs,
 		tests=tests,
 		pagination=pagination
 	)
@@ -180,11 +183,10 @@ def create(extension: str = None):
 	if not current_user.is_authenticated:
 		return redirect(url_for('testing.get_catalog'))
 	if extension is not None:
-		try:
-			extension_module = importlib.import_module('extensions.%s' % extension)
-		except:
-			logging.error('Extension import error', exc_info=1)
-			redirect(url_for('testing.get_catalog'))
+		extension_module = get_extension_module(extension)
+		if extension_module is None:
+			logging.error('Extension not registered: %s' % extension)
+			return redirect(url_for('testing.get_catalog'))
 		creator = TestForm(extension_module=extension_module)
 		if creator.validate_on_submit():
 			TestStore.create(
@@ -214,12 +216,11 @@ def update(uid: str):
 		return redirect(url_for('testing.get_catalog'))
 	test = TestStore.read(uid)
 	if not verify_test_owner(test):
-		return reidrect(url_for('testing.get_catalog'))
-	try:
-		extension_module = importlib.import_module('extensions.%s' % test.extension)
-	except:
-		logging.error('Extension import error', exc_info=1)
-		redirect(url_for('test.get_catalog'))
+		return redirect(url_for('testing.get_catalog'))
+	extension_module = get_extension_module(test.extension)
+	if extension_module is None:
+		logging.error('Extension not registered: %s' % test.extension)
+		return redirect(url_for('testing.get_catalog'))
 	if request.method == 'GET':
 		updater = TestForm(extension_module, test)
 	else:
@@ -248,6 +249,6 @@ def delete(uid: str):
 		return redirect(url_for('testing.get_catalog'))
 	test = TestStore.read(uid)
 	if not verify_test_owner(test):
-		return reidrect(url_for('testing.get_catalog'))
+		return redirect(url_for('testing.get_catalog'))
 	TestStore.delete(uid)
 	return redirect(url_for('testing.get_catalog'))
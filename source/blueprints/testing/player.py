@@ -7,7 +7,6 @@ Blueprint module to handle testing player routes.
 # Standard libraries import
 import json
 import datetime
-import importlib
 import logging
 
 # Application modules import
@@ -16,6 +15,10 @@ from blueprints.testing import blueprint
 from blueprints.__locale__ import __
 from blueprints.__args__ import get_boolean
 from blueprints.__pagination__ import get_pagination
+from blueprints.__pagination__ import set_cursors
+from blueprints.__extensions__ import get_extension_module
+from blueprints.__extensions__ import get_test_options
+from models.__base__ import Store
 from models.process_store import ProcessStore
 from models.test_store import TestStore
 from models.task_store import TaskStore
@@ -33,7 +36,6 @@ from flask_wtf import FlaskForm
 from wtforms import StringField
 from wtforms import SubmitField
 from flask_login import current_user
-from sqlalchemy import func
 
 # Global constants
 process_template = __('TEST') + ': %s\n' + __('STATUS') + ': %s'
@@ -75,9 +77,11 @@ def verify_process_owner(process: Process,
 	if current_user.get_id() is not None and \
 			current_user.get_id() != process.user_uid:
 		return False
-	if current_user.get_token() is not None and \
-			current_user.get_token() != process.anonymous_token:
-		return False
+	if current_user.get_id() is None and (
+				current_user.get_anonymous_id() is None or \
+				current_user.get_anonymous_id() != process.anonymous_id
+			):
+		return False # Anonymous without id (nothing started) owns nothing
 	if not ignore_name and current_user.get_name() is not None and \
 			current_user.get_name().uid != process.name_uid:
 		return False
@@ -92,12 +96,28 @@ def start(uid: str = None):
 	"""
 	if session.get('timezone_offset') is None:
 		return redirect(url_for('testing.get_catalog'))
-	test = TestStore.rand() if uid is None else TestStore.read(uid)
+	if uid is None and not any(
+				name in request.args
+				for name in ['extension', 'filterCatalogHideGlobal']
+			):
+		test = TestStore.rand()
+	elif uid is None:
+		# Random test sent by catalog respects its filters (random_kwargs)
+		filter_hide_global = request.args.get('filterCatalogHideGlobal') \
+			in ['true', 'True'] if current_user.is_authenticated else None
+		test = TestStore.rand(
+			request.args.get('extension'),
+			current_user.get_id(),
+			current_user.get_admin_uid_list() if not filter_hide_global else []
+		)
+	else:
+		test = TestStore.read(uid)
 	if test is None:
 		return redirect(url_for('testing.get_catalog'))
 	name = current_user.get_name()
 	process = ProcessStore.create(
-		test.id, current_user.get_id(), current_user.get_token(),
+		test.id, current_user.get_id(),
+		current_user.get_anonymous_id(create=True),
 		name.uid if name is not None else None,
 		datetime.datetime.utcnow() - \
 			datetime.timedelta(minutes=session['timezone_offset'])
@@ -121,7 +141,9 @@ def play(uid: str):
 	"""
 	if session.get('timezone_offset') is None:
 		return redirect(url_for('testing.get_history'))
-	process, test, _, _ = ProcessStore.read_with_test(uid)
+	# Read process with pending (continue on existing) and last passed tasks
+	process, test, task, passed_task = \
+		ProcessStore.read_player_state(uid) or (None, None, None, None)
 	if not verify_process_owner(process):
 		if request.method == 'POST' and request.form.get('ajax'):
 			return { 'redirect': url_for('testing.get_catalog') }
@@ -130,17 +152,18 @@ def play(uid: str):
 		if request.method == 'POST' and request.form.get('ajax'):
 			return { 'redirect': url_for('testing.get_result', uid=uid) }
 		return redirect(url_for('testing.get_result', uid=uid))
-	# Import extension module and get data
-	extension_module = importlib.import_module('extensions.%s' % test.extension)
-	data = extension_module.get_data(json.loads(test.extension_options))
-	# Read previous tasks
-	task = None
-	passed_tasks = TaskStore.read_list(
-		offset=0, limit=0, filter_process_id=process.id)
-	if passed_tasks and passed_tasks[0].answer is None:
-		# Continue on existing task
-		task = passed_tasks[0]
-		passed_tasks = passed_tasks[1:]
+	# Get extension module (registry) and data (cached options)
+	extension_module = get_extension_module(test.extension)
+	if extension_module is None:
+		logging.error('Extension not registered: %s' % test.extension)
+		return redirect(url_for('testing.get_catalog'))
+	options = get_test_options(test)
+	if options is None: # Options made stale by extension choices
+		if request.method == 'POST' and request.form.get('ajax'):
+			return { 'redirect': url_for('testing.get_catalog') }
+		return redirect(url_for('testing.get_catalog'))
+	data = extension_module.get_data(options)
+	passed_tasks = [passed_task] if passed_task is not None else []
 	# Handle filter form
 	player_audio = None
 	player = PlayerForm()
@@ -152,11 +175,15 @@ def play(uid: str):
 			if request.form.get('ajax'):
 				passed_tasks = None
 		else:
-			task = TaskStore.set_answer(task.uid, user_answer)
-			process = ProcessStore.add_answer(
-				process.uid, task, datetime.datetime.utcnow() - \
-					datetime.timedelta(minutes=session['timezone_offset'])
-			)
+			# Stage answer, process and next task to commit them once
+			with Store.unit_of_work():
+				passed_task = TaskStore.set_answer(task.uid, user_answer)
+				process = ProcessStore.add_answer(
+					process, test, passed_task, datetime.datetime.utcnow() - \
+						datetime.timedelta(minutes=session['timezone_offset'])
+				)
+				if process.answer_count < test.answer_count:
+					task = TaskStore.create(process.id, json.dumps(data))
 			if process.answer_count == test.answer_count:
 				if current_user.is_authenticated and \
 							current_user.user.notification_test_complete:
@@ -171,9 +198,8 @@ def play(uid: str):
 					return { 'redirect': url_for('testing.get_result', uid=uid) }
 				return redirect(url_for('test.get_result', uid=uid))
 			player_audio = 'correct-audio' \
-				if task.correct_answer else 'incorrect-audio'
-			passed_tasks = [task] + passed_tasks
-			task = TaskStore.create(process.id, json.dumps(data))
+				if passed_task.correct_answer else 'incorrect-audio'
+			passed_tasks = [passed_task]
 			player.answer.data = None
 	elif task is None:
 		task = TaskStore.create(process.id, json.dumps(data))
@@ -217,19 +243,18 @@ def hold(uid: str):
 	"""
 	if session.get('timezone_offset') is None:
 		return redirect(url_for('testing.get_history'))
-	process, test, _, _ = ProcessStore.read_with_test(uid)
+	process, test, task, _ = \
+		ProcessStore.read_player_state(uid) or (None, None, None, None)
 	if not verify_process_owner(process):
 		return redirect(url_for('testing.get_catalog'))
 	if process.answer_count == test.answer_count:
 		return redirect(url_for('testing.get_result', uid=uid))
-	passed_tasks = TaskStore.read_list(
-		offset=0, limit=0, filter_process_id=process.id)
-	if passed_tasks and passed_tasks[0].answer is None:
-		TaskStore.delete(passed_tasks[0].uid)
+	if task is not None:
+		TaskStore.delete(task.uid)
 	process.answer_time += 10
 	ProcessStore.update(
 		process.uid, process.test_id, process.user_uid,
-		process.anonymous_token, process.name_uid,
+		process.anonymous_id, process.name_uid,
 		datetime.datetime.utcnow() - \
 			datetime.timedelta(minutes=session['timezone_offset']),
 		process.answer_count, process.correct_count,
@@ -243,8 +268,7 @@ def get_result(uid: str):
 	"""
 	Return testing result page.
 	"""
-	process, test, result, crammers = ProcessStore.read_with_test(
-		uid, get_result_expression(), get_crammers_expression())
+	process, test = ProcessStore.read_with_test(uid)
 	if not verify_process_owner(process, ignore_name=True):
 		return redirect(url_for('testing.get_process', uid=uid))
 	if process.answer_count < test.answer_count:
@@ -269,8 +293,6 @@ def get_result(uid: str):
 		'testing/result.html',
 		process=process,
 		test=test,
-		result=result,
-		crammers=crammers,
 		passed_tasks=passed_tasks,
 		name_value=name_value,
 		player_audio=player_audio,
@@ -302,30 +324,24 @@ def get_history(uid: str):
 		]
 	# Prepare list data
 	name = current_user.get_name() if filters[1]['value'] else None
-	pagination = get_pagination(
+	anonymous_id = current_user.get_anonymous_id()
+	pagination, processes = get_pagination(
 		'process',
-		ProcessStore.count_list(
+		lambda offset, limit, cursor: ProcessStore.read_page(
+			offset, limit,
 			test.uid,
 			filters[0]['value'],
 			current_user.get_id(),
-			current_user.get_token(),
-			name.uid if name is not None else None
-		)
+			anonymous_id,
+			name.uid if name is not None else None,
+			cursor
+		) if current_user.is_authenticated or anonymous_id is not None else \
+			([], 0) # Anonymous without id has no processes yet
 	)
 	pagination['endpoint'] = 'testing.get_history'
 	pagination['pre_kwargs'] = { 'uid': uid }
 	pagination['prefix'] = 'process'
-	processes = ProcessStore.read_list(
-		(pagination['page_index'] - 1) * pagination['per_page'],
-		pagination['per_page'],
-		test.uid,
-		filters[0]['value'],
-		current_user.get_id(),
-		current_user.get_token(),
-		name.uid if name is not None else None,
-		get_result_expression(),
-		get_crammers_expression()
-	)
+	set_cursors(pagination, [process for process, _, _ in processes])
 	return render_template(
 		'testing/history.html',
 		current_test=test,
@@ -334,18 +350,3 @@ def get_history(uid: str):
 		pagination=pagination,
 	)
 
-
-def get_result_expression():
-	"""
-	Return result calculation expression.
-	"""
-	return 1.0 * Process.correct_count / Process.answer_count * 100 * \
-		func.min(1.0 * Process.limit_time / Process.answer_time, 1.0)
-
-
-def get_crammers_expression():
-	"""
-	Return result calculation expression.
-	"""
-	return 1.0 * Process.correct_count / Process.answer_count * \
-		Process.limit_time / Process.answer_time * Process.correct_count
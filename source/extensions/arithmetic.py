@@ -14,6 +14,9 @@ SUBSTRACTION_TIME_PER_BIT = 3.0
 MULTIPLICATION_TIME_PER_BIT = 3.5
 DIVISION_TIME_PER_BIT = 3.5
 
+# Plugin interface version (see blueprints/__extensions__.py)
+INTERFACE_VERSION = 1
+
 # Plugin options
 options = [
 	{
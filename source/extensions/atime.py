@@ -15,6 +15,9 @@ CALCULATION_TIME_PER_TASK = 20.0
 # Default constants
 MAX_MINUTES = 24 * 60
 
+# Plugin interface version (see blueprints/__extensions__.py)
+INTERFACE_VERSION = 1
+
 # Plugin options
 options = [
 	{
@@ -4,13 +4,27 @@
 Base module for base store.
 '''
 
+# Standard libraries import
+import random
+import datetime
+from contextlib import contextmanager
+
 # Additional libraries import
 from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy import and_
 
 # Application modules import
 from models import database
 from models.entity.__base__ import Entity
 
+# Session info key for nested units of work depth
+UNIT_OF_WORK_KEY = 'unit_of_work'
+# Keyset pagination cursor directions and datetime format
+CURSOR_NEXT = 'n'
+CURSOR_PREV = 'p'
+CURSOR_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
 
 class Store():
 	"""
@@ -24,7 +38,7 @@ class Store():
 		"""
 		try:
 			database.session.add(entity)
-			database.session.commit()
+			Store.commit()
 			return entity
 		except:
 			database.session.rollback()
@@ -45,7 +59,7 @@ class Store():
 		"""
 		try:
 			entity.set_modified()
-			database.session.commit()
+			Store.commit()
 			return entity
 		except:
 			database.session.rollback()
@@ -59,12 +73,62 @@ class Store():
 		"""
 		try:
 			entity.set_deleted()
-			database.session.commit()
+			Store.commit()
 			return entity
 		except:
 			database.session.rollback()
 			raise
 
+	@staticmethod
+	@contextmanager
+	def unit_of_work():
+		"""
+		Stage creates, updates and deletes within context
+		and commit them once on exit (rollback on error).
+		"""
+		depth = database.session.info.get(UNIT_OF_WORK_KEY, 0)
+		database.session.info[UNIT_OF_WORK_KEY] = depth + 1
+		try:
+			yield
+			if depth == 0:
+				database.session.commit()
+		except:
+			database.session.rollback()
+			raise
+		finally:
+			database.session.info[UNIT_OF_WORK_KEY] = depth
+
+	@staticmethod
+	def commit() -> None:
+		"""
+		Commit session or flush it only within unit of work.
+		"""
+		if database.session.info.get(UNIT_OF_WORK_KEY, 0) > 0:
+			database.session.flush()
+		else:
+			database.session.commit()
+
+	@staticmethod
+	def update_list(query, values: dict) -> int:
+		"""
+		Update (set values and modified utc) entities of query
+		within one statement and return updated entity number.
+		"""
+		try:
+			entity_class = query.column_descriptions[0]['entity']
+			updated_count = query.update(
+				{
+					**values,
+					entity_class.modified_utc: datetime.datetime.utcnow()
+				},
+				synchronize_session=False
+			)
+			Store.commit()
+			return updated_count
+		except:
+			database.session.rollback()
+			raise
+
 	@staticmethod
 	def get(entity_class, id: int) -> Entity:
 		"""
@@ -80,3 +144,119 @@ class Store():
 		return database.session.execute(
 			query.statement.with_only_columns([func.count()]).order_by(None)
 		).scalar() or 0
+
+	@staticmethod
+	def paginate(query, entity_class, offset: int, limit: int,
+							 cursor: str = None) -> list:
+		"""
+		Return list of query rows ordered by entity modified_utc and id
+		(descending) next to cursor or by offset (without cursor).
+		"""
+		order = [entity_class.modified_utc.desc(), entity_class.id.desc()]
+		key = _parse_cursor(cursor)
+		if key is None:
+			return query.order_by(None).order_by(
+				*order
+			).limit(limit).offset(offset).all()
+		direction, modified_utc, id = key
+		if direction == CURSOR_NEXT:
+			return query.filter(
+				or_(
+					entity_class.modified_utc < modified_utc,
+					and_(
+						entity_class.modified_utc == modified_utc,
+						entity_class.id < id
+					)
+				)
+			).order_by(None).order_by(*order).limit(limit).all()
+		return list(reversed(query.filter(
+			or_(
+				entity_class.modified_utc > modified_utc,
+				and_(
+					entity_class.modified_utc == modified_utc,
+					entity_class.id > id
+				)
+			)
+		).order_by(None).order_by(
+			entity_class.modified_utc, entity_class.id
+		).limit(limit).all()))
+
+	@staticmethod
+	def read_page(query, entity_class, offset: int, limit: int,
+								cursor: str = None) -> (list, int):
+		"""
+		Return list of query rows (as paginate does) and total number of rows
+		counted within the same statement (window count for offset pages and
+		uncorrelated count subquery for keyset pages filtered by cursor).
+		"""
+		single = len(query.column_descriptions) == 1
+		if _parse_cursor(cursor) is None:
+			total_column = func.count().over()
+		else:
+			total_column = query.statement.with_only_columns(
+				[func.count()]
+			).order_by(None).correlate(None).as_scalar()
+		rows = Store.paginate(
+			query.add_columns(total_column),
+			entity_class, offset, limit, cursor
+		)
+		if not rows:
+			return rows, Store.count(query)
+		total = rows[0][-1]
+		return [row[0] if single else tuple(row[:-1]) for row in rows], total
+
+	@staticmethod
+	def rand(query, entity_class) -> Entity:
+		"""
+		Return random row of query (or None for empty query) probed
+		by random id between table bounds in primary key order
+		(next row from probe or previous one if there is no next row).
+		"""
+		min_id, max_id = database.session.query( # Separate to use primary key
+			database.session.query(func.min(entity_class.id)).as_scalar(),
+			database.session.query(func.max(entity_class.id)).as_scalar()
+		).one()
+		if min_id is None:
+			return None
+		probe_id = random.randint(min_id, max_id)
+		query = query.order_by(None)
+		entity = query.filter(
+			entity_class.id >= probe_id
+		).order_by(
+			entity_class.id
+		).first()
+		if entity is None:
+			entity = query.filter(
+				entity_class.id < probe_id
+			).order_by(
+				entity_class.id.desc()
+			).first()
+		return entity
+
+	@staticmethod
+	def get_cursor(entity: Entity, direction: str) -> str:
+		"""
+		Return keyset pagination cursor for entity
+		(direction is CURSOR_NEXT or CURSOR_PREV).
+		"""
+		return '%s%s_%d' % (
+			direction, entity.modified_utc.strftime(CURSOR_FORMAT), entity.id)
+
+
+def _parse_cursor(cursor: str) -> tuple:
+	"""
+	Return direction, modified_utc and id parsed from cursor
+	or return None for undefined or invalid cursor.
+	"""
+	if not cursor or cursor[0] not in (CURSOR_NEXT, CURSOR_PREV):
+		return None
+	try:
+		modified_utc, id = cursor[1:].split('_')
+		return (
+			cursor[0],
+			datetime.datetime.strptime(modified_utc, CURSOR_FORMAT),
+			int(id)
+		)
+	except ValueError:
+		return None
+
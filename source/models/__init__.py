@@ -9,6 +9,7 @@ import os
 
 # Additional libraries import
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import MetaData
 from flask_migrate import Migrate
 
 # Application modules import
@@ -23,11 +24,23 @@ else:
 	application.config['SQLALCHEMY_DATABASE_URI'] = CONFIG['database']['URI'] + \
 		os.path.join(database_folder, CONFIG['database']['filename'])
 application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-database = SQLAlchemy(application)
-migrate = Migrate(application, database, directory=database_folder)
+database = SQLAlchemy(
+	application,
+	metadata=MetaData(naming_convention={ # Batch migration alters named only
+		'ix': 'ix_%(column_0_label)s',
+		'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'
+	})
+)
+migrate = Migrate(
+	application, database, directory=database_folder,
+	render_as_batch=True # SQLite alters constraints by table copy only
+)
 
 # Entity modules import (prevent circular import)
 from models.entity import user
+from models.entity import anonymous
 from models.entity import test
 from models.entity import process
 from models.entity import task
+from models.entity import rating
+from models.entity import tombstone
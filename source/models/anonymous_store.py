@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+'''
+Store module for Anonymous entity.
+'''
+
+# Application modules import
+from models import database
+from models.__base__ import Store
+from models.entity.anonymous import Anonymous
+from models.entity.process import Process
+
+
+class AnonymousStore(Store):
+	"""
+	This is an anonymous store class.
+	"""
+
+	@staticmethod
+	def create(legacy_token: str = None) -> Anonymous:
+		"""
+		Create and return anonymous.
+		"""
+		return super(AnonymousStore, AnonymousStore).create(
+			Anonymous(legacy_token)
+		)
+
+	@staticmethod
+	def read(uid: str) -> Anonymous:
+		"""
+		Return anonymous by uid (only not deleted).
+		"""
+		return super(AnonymousStore, AnonymousStore).read(
+			Anonymous, uid
+		)
+
+	@staticmethod
+	def read_by_legacy_token(legacy_token: str) -> Anonymous:
+		"""
+		Return anonymous by legacy (migrated) token (only not deleted).
+		"""
+		return Anonymous.query.filter_by(
+			legacy_token=legacy_token, deleted_utc=None).first()
+
+	@staticmethod
+	def migrate() -> int:
+		"""
+		Migrate processes from legacy anonymous tokens to anonymous entities
+		and return migrated process number (rating should be rebuilt).
+		"""
+		anonymous_ids = {
+			legacy_token: id for legacy_token, id in database.session.query(
+				Anonymous.legacy_token, Anonymous.id
+			).filter(
+				Anonymous.legacy_token != None,
+				Anonymous.deleted_utc == None
+			).all()
+		} # Legacy token is not indexed (read by migration only)
+		process_count = 0
+		with Store.unit_of_work():
+			for legacy_token, in database.session.query(
+						Process.anonymous_token
+					).filter(
+						Process.anonymous_token != None
+					).distinct().all():
+				if legacy_token not in anonymous_ids:
+					anonymous_ids[legacy_token] = \
+						AnonymousStore.create(legacy_token).id
+				process_count += Store.update_list(
+					database.session.query(
+						Process
+					).filter(
+						Process.anonymous_token == legacy_token
+					),
+					{
+						Process.anonymous_id: anonymous_ids[legacy_token],
+						Process.anonymous_token: None
+					}
+				)
+		return process_count
@@ -23,7 +23,7 @@ class Entity(database.Model):
 	"""
 	__abstract__ = True
 	id = Column(database.Integer, primary_key=True)
-	uid = Column(database.String)
+	uid = Column(database.String, index=True, unique=True)
 	created_utc = Column(database.DateTime)
 	modified_utc = Column(database.DateTime)
 	deleted_utc = Column(database.DateTime)
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+'''
+Entity module for anonymous entity.
+'''
+
+# Additional libraries import
+from sqlalchemy import Column
+
+# Project modules imports
+from models import database
+from models.entity.__base__ import Entity
+
+
+class Anonymous(Entity):
+	'''
+	This is a class for Anonymous entity (compact anonymous identity
+	referenced by processes and ratings with integer id).
+	'''
+	__tablename__ = 'anonymous'
+	legacy_token = Column(database.String, index=False, nullable=True)
+
+	def __init__(self, legacy_token: str = None) -> "Anonymous":
+		'''
+		Initiate object and stores Anonymous' data.
+		'''
+		super().__init__()
+		self.legacy_token = legacy_token
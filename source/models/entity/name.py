@@ -22,7 +22,7 @@ class Name(Entity):
 		database.Integer, ForeignKey('user.id'),
 		index=True, nullable=True
 	)
-	value = Column(database.String, index=True, nullable=False)
+	value = Column(database.String, index=False, nullable=False)
 
 	def __init__(self, user_id: int, value: str) -> "Name":
 		'''
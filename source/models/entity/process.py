@@ -18,33 +18,48 @@ class Process(Entity):
 	This is a class for Process entity.
 	'''
 	__tablename__ = 'process'
+	__table_args__ = (
+		database.Index(
+			'ix_process_test_id_deleted_utc_modified_utc',
+			'test_id', 'deleted_utc', 'modified_utc'
+		),
+		database.Index(
+			'ix_process_user_uid_name_uid', 'user_uid', 'name_uid'
+		),
+	)
 	test_id = Column(
 		database.Integer, ForeignKey('test.id'),
-		index=True, nullable=False
+		index=False, nullable=False
 	)
 	answer_count = Column(
 		database.Integer, default=0,
-		index=True, nullable=False
+		index=False, nullable=False
 	)
 	correct_count = Column(
 		database.Integer, default=0,
-		index=True, nullable=False
+		index=False, nullable=False
 	)
 	limit_time = Column(
 		database.Integer, default=0,
-		index=True, nullable=False
+		index=False, nullable=False
 	)
 	answer_time = Column(
 		database.Integer, default=0,
-		index=True, nullable=False
+		index=False, nullable=False
+	)
+	user_uid = Column(database.String, index=False, nullable=True)
+	anonymous_id = Column(
+		database.Integer, ForeignKey('anonymous.id'),
+		index=True, nullable=True
 	)
-	user_uid = Column(database.String, index=True, nullable=True)
-	anonymous_token = Column(database.String, index=True, nullable=True)
-	name_uid = Column(database.String, index=True, nullable=True)
-	modified_local = Column(database.DateTime, index=True, nullable=True)
+	anonymous_token = Column(database.String, index=False, nullable=True)
+	name_uid = Column(database.String, index=False, nullable=True)
+	modified_local = Column(database.DateTime, index=False, nullable=True)
+	result = Column(database.Integer, index=False, nullable=True)
+	crammers = Column(database.Integer, index=False, nullable=True)
 
 	def __init__(self, test_id: int,
-							 user_uid: str, anonymous_token: str,
+							 user_uid: str, anonymous_id: int,
 							 name_uid: str, modified_local) -> "Process":
 		'''
 		Initiate object and stores Process' data.
@@ -52,6 +67,20 @@ class Process(Entity):
 		super().__init__()
 		self.test_id = test_id
 		self.user_uid = user_uid
-		self.anonymous_token = anonymous_token
+		self.anonymous_id = anonymous_id
 		self.name_uid = name_uid
 		self.modified_local = modified_local
+
+	def set_completed(self):
+		'''
+		Set result and crammers values calculated on completion.
+		'''
+		answer_time = max(self.answer_time, 1)
+		self.result = int(
+			1.0 * self.correct_count / self.answer_count * 100 * \
+				min(1.0 * self.limit_time / answer_time, 1.0)
+		)
+		self.crammers = int(
+			1.0 * self.correct_count / self.answer_count * \
+				self.limit_time / answer_time * self.correct_count
+		)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+'''
+Entity module for rating entity.
+'''
+
+# Additional libraries import
+from sqlalchemy import Column
+from sqlalchemy import ForeignKey
+
+# Project modules imports
+from models import database
+from models.entity.__base__ import Entity
+
+
+class Rating(Entity):
+	'''
+	This is a class for Rating entity (daily crammers rollup
+	by name, extension and local day of completed processes,
+	scored processes with crammers are rolled up separately).
+	'''
+	__tablename__ = 'rating'
+	__table_args__ = (
+		database.Index(
+			'ix_rating_date_local_extension', 'date_local', 'extension'
+		),
+		database.Index(
+			'ix_rating_user_uid_name_uid', 'user_uid', 'name_uid'
+		),
+		database.Index(
+			'ix_rating_rollup_key', 'rollup_key', unique=True
+		),
+	)
+	rollup_key = Column(database.String, index=False, nullable=True)
+	date_local = Column(database.Date, index=False, nullable=False)
+	extension = Column(database.String, index=False, nullable=False)
+	scored = Column(database.Boolean, index=False, nullable=False)
+	name_uid = Column(database.String, index=False, nullable=True)
+	user_uid = Column(database.String, index=False, nullable=True)
+	anonymous_id = Column(
+		database.Integer, ForeignKey('anonymous.id'),
+		index=True, nullable=True
+	)
+	process_count = Column(
+		database.Integer, default=0,
+		index=False, nullable=False
+	)
+	correct_count = Column(
+		database.Integer, default=0,
+		index=False, nullable=False
+	)
+	answer_time = Column(
+		database.Integer, default=0,
+		index=False, nullable=False
+	)
+	crammers = Column(
+		database.Integer, default=0,
+		index=False, nullable=False
+	)
+	modified_local = Column(database.DateTime, index=False, nullable=True)
+
+	def __init__(self, date_local, extension: str, scored: bool,
+							 name_uid: str, user_uid: str,
+							 anonymous_id: int) -> "Rating":
+		'''
+		Initiate object and stores Rating's data.
+		'''
+		super().__init__()
+		self.rollup_key = get_rollup_key(
+			date_local, extension, scored, name_uid, user_uid, anonymous_id)
+		self.date_local = date_local
+		self.extension = extension
+		self.scored = scored
+		self.name_uid = name_uid
+		self.user_uid = user_uid
+		self.anonymous_id = anonymous_id
+		self.process_count = 0
+		self.correct_count = 0
+		self.answer_time = 0
+		self.crammers = 0
+
+
+def get_rollup_key(date_local, extension: str, scored: bool,
+									 name_uid: str, user_uid: str, anonymous_id: int) -> str:
+	'''
+	Return rollup key (unique) of local day, extension, scored, name and owner
+	(nullable columns are not unique within index themselves).
+	'''
+	return '%s|%s|%d|%s|%s|%s' % (
+		date_local.isoformat(), extension, scored, name_uid or '',
+		user_uid or '', '' if anonymous_id is None else anonymous_id
+	)
@@ -18,13 +18,19 @@ class Task(Entity):
 	This is a class for Task entity.
 	'''
 	__tablename__ = 'task'
+	__table_args__ = (
+		database.Index(
+			'ix_task_process_id_deleted_utc_modified_utc',
+			'process_id', 'deleted_utc', 'modified_utc'
+		),
+	)
 	process_id = Column(
 		database.Integer, ForeignKey('process.id'),
-		index=True, nullable=False
+		index=False, nullable=False
 	)
-	data = Column(database.String, index=True, nullable=False)
-	answer = Column(database.String, index=True, nullable=True)
-	correct_answer = Column(database.Boolean, index=True, nullable=True)
+	data = Column(database.String, index=False, nullable=False)
+	answer = Column(database.String, index=False, nullable=True)
+	correct_answer = Column(database.Boolean, index=False, nullable=True)
 
 	def __init__(self, process_id: int, data: str) -> "Task":
 		'''
@@ -18,10 +18,15 @@ class Test(Entity):
 	This is a class for Test entity.
 	'''
 	__tablename__ = 'test'
-	name = Column(database.String, index=True, nullable=False)
-	extension = Column(database.String, index=True, nullable=False)
-	extension_options = Column(database.String, index=True, nullable=False)
-	answer_count = Column(database.Integer, index=True, nullable=False)
+	__table_args__ = (
+		database.Index(
+			'ix_test_deleted_utc_modified_utc', 'deleted_utc', 'modified_utc'
+		),
+	)
+	name = Column(database.String, index=False, nullable=False)
+	extension = Column(database.String, index=False, nullable=False)
+	extension_options = Column(database.String, index=False, nullable=False)
+	answer_count = Column(database.Integer, index=False, nullable=False)
 	user_uid = Column(database.String, index=True, nullable=True)
 
 	def __init__(self, name: str, extension: str, extension_options: str,
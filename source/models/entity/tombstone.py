@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+'''
+Entity module for tombstone entity.
+'''
+
+# Additional libraries import
+from sqlalchemy import Column
+
+# Project modules imports
+from models import database
+from models.entity.__base__ import Entity
+
+
+class Tombstone(Entity):
+	'''
+	This is a class for Tombstone entity (uid of hard deleted row
+	by table, read by incremental export to propagate deletes).
+	'''
+	__tablename__ = 'tombstone'
+	__table_args__ = (
+		database.Index(
+			'ix_tombstone_table_name_modified_utc', 'table_name', 'modified_utc'
+		),
+	)
+	table_name = Column(database.String, index=False, nullable=False)
+	row_uid = Column(database.String, index=False, nullable=False)
+
+	def __init__(self, table_name: str, row_uid: str) -> "Tombstone":
+		'''
+		Initiate object and stores Tombstone's data.
+		'''
+		super().__init__()
+		self.table_name = table_name
+		self.row_uid = row_uid
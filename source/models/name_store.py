@@ -56,13 +56,16 @@ class NameStore(Store):
 
 	@staticmethod
 	def read_list(offset: int, limit: int,
-							  filter_user_id: int, filter_value: str) -> list:
+							  filter_user_id: int, filter_value: str,
+								cursor: str = None) -> list:
 		"""
-		Return list of names by arguments.
+		Return list of names by arguments (next to cursor if defined).
 		"""
-		return _get_list_query(
-			filter_user_id, filter_value
-		).limit(limit).offset(offset).all()
+		return super(NameStore, NameStore).paginate(
+			_get_list_query(
+				filter_user_id, filter_value
+			), Name, offset, limit, cursor
+		)
 
 	@staticmethod
 	def count_list(filter_user_id: int, filter_value: str) -> int:
@@ -15,15 +15,16 @@ from models.entity.process import Process
 from models.entity.test import Test
 from models.entity.task import Task
 from models.entity.name import Name
+from models.entity.rating import Rating
+from models.rating_store import RatingStore
 
 # Additional libraries import
 import sqlalchemy
 from sqlalchemy import func
-from sqlalchemy import or_
 from sqlalchemy import and_
 from sqlalchemy import desc
-from sqlalchemy.sql.expression import literal
 from sqlalchemy.sql.expression import cast
+from sqlalchemy.orm import aliased
 
 
 class ProcessStore(Store):
@@ -32,14 +33,14 @@ class ProcessStore(Store):
 	"""
 
 	@staticmethod
-	def create(test_id: int, user_uid: str, anonymous_token: str,
+	def create(test_id: int, user_uid: str, anonymous_id: int,
 						 name_uid: str, modified_local: datetime.datetime) -> Process:
 		"""
 		Create and return process.
 		"""
 		return super(ProcessStore, ProcessStore).create(
 			Process(
-				test_id, user_uid, anonymous_token, name_uid, modified_local
+				test_id, user_uid, anonymous_id, name_uid, modified_local
 			)
 		)
 
@@ -54,7 +55,7 @@ class ProcessStore(Store):
 
 	@staticmethod
 	def update(uid: str, test_id: int,
-						 user_uid: str, anonymous_token: str, name_uid: str,
+						 user_uid: str, anonymous_id: int, name_uid: str,
 						 modified_local: datetime.datetime,
 						 answer_count: int, correct_count: int,
 						 limit_time: int, answer_time: int) -> Process:
@@ -64,7 +65,7 @@ class ProcessStore(Store):
 		process = ProcessStore.read(uid)
 		process.test_id = test_id
 		process.user_uid = user_uid
-		process.anonymous_token = anonymous_token
+		process.anonymous_id = anonymous_id
 		process.name_uid = name_uid
 		process.modified_local = modified_local
 		process.answer_count = answer_count
@@ -88,44 +89,59 @@ class ProcessStore(Store):
 	def read_list(offset: int, limit: int,
 								filter_test_uid: str,
 								filter_hide_completed: bool,
-								filter_user_uid: str, filter_anonymous_token: str,
+								filter_user_uid: str, filter_anonymous_id: int,
 								filter_name_uid: str,
-								result_expression = literal(0),
-								crammers_expression = literal(0)) -> list:
+								cursor: str = None) -> list:
 		"""
-		Return list of processes by arguments.
+		Return list of processes by arguments (next to cursor if defined).
 		"""
-		return _get_list_query(
-			filter_test_uid, filter_hide_completed,
-			filter_user_uid, filter_anonymous_token, filter_name_uid,
-			result_expression, crammers_expression
-		).limit(limit).offset(offset).all()
+		return super(ProcessStore, ProcessStore).paginate(
+			_get_list_query(
+				filter_test_uid, filter_hide_completed,
+				filter_user_uid, filter_anonymous_id, filter_name_uid
+			), Process, offset, limit, cursor
+		)
+
+	@staticmethod
+	def read_page(offset: int, limit: int,
+								filter_test_uid: str,
+								filter_hide_completed: bool,
+								filter_user_uid: str, filter_anonymous_id: int,
+								filter_name_uid: str,
+								cursor: str = None) -> (list, int):
+		"""
+		Return list of processes by arguments (next to cursor if defined)
+		and number of processes in list.
+		"""
+		return super(ProcessStore, ProcessStore).read_page(
+			_get_list_query(
+				filter_test_uid, filter_hide_completed,
+				filter_user_uid, filter_anonymous_id, filter_name_uid
+			), Process, offset, limit, cursor
+		)
 
 	@staticmethod
 	def count_list(filter_test_uid: str,
 								 filter_hide_completed: bool,
-								 filter_user_uid: str, filter_anonymous_token: str,
-								 filter_name_uid: str,
-								 result_expression = literal(0),
-								 crammers_expression = literal(0)) -> int:
+								 filter_user_uid: str, filter_anonymous_id: int,
+								 filter_name_uid: str) -> int:
 		"""
 		Return number of processes in list.
 		"""
 		return Store.count(_get_list_query(
 			filter_test_uid, filter_hide_completed,
-			filter_user_uid, filter_anonymous_token, filter_name_uid,
-			result_expression, crammers_expression
+			filter_user_uid, filter_anonymous_id, filter_name_uid
 		))
 
 	@staticmethod
-	def add_answer(uid: str, task: Task,
+	def add_answer(process: Process, test: Test, task: Task,
 								 modified_local: datetime.datetime) -> Process:
 		"""
 		Return process after increment answer count and
 		if answer is correct then insrement correct count.
-		Also calculate answer and limit time.
+		Also calculate answer and limit time
+		(and result with crammers on completion).
 		"""
-		process, test, _, _ = ProcessStore.read_with_test(uid)
 		process.answer_count += 1
 		data = json.loads(task.data)
 		if task.correct_answer:
@@ -133,36 +149,58 @@ class ProcessStore(Store):
 		process.answer_time += \
 			int((task.modified_utc - task.created_utc).total_seconds())
 		process.limit_time += int(data['limit_time'])
-		if process.answer_count >= test.answer_count:
-			correctness = int(process.correct_count / process.answer_count * 100)
-			speed = \
-				int(process.answer_time / process.limit_time * 100)
-			if speed > 100:
-				speed = 100
-			# process.result = int(correctness * speed / 100)
 		process.modified_local = modified_local
+		if process.answer_count >= test.answer_count:
+			process.set_completed()
+			RatingStore.add_process(process, test.extension)
 		return super(ProcessStore, ProcessStore).update(
 			process
 		)
 
 	@staticmethod
-	def bind_token(user_uid: str, anonymous_token: str) -> int:
+	def bind_anonymous(user_uid: str, anonymous_id: int) -> int:
 		"""
-		Bind (replace anonymous_token with user_uid) processes
+		Bind (replace anonymous_id with user_uid) processes
 		and return binded process number.
 		"""
-		binded_count = 0
-		while True:
-			process_list = ProcessStore.read_list(
-				0, 100, None, None, None, anonymous_token, None)
-			if len(process_list) == 0:
-				break
-			else:
-				for process, test, _, _, _ in process_list:
-					process.user_uid = user_uid
-					process.anonymous_token = None
-					super(ProcessStore, ProcessStore).update(process)
-					binded_count += 1
+		if anonymous_id is None:
+			return 0
+		with Store.unit_of_work():
+			binded_count = Store.update_list(
+				database.session.query(
+					Process
+				).filter(
+					Process.anonymous_id == anonymous_id,
+					Process.deleted_utc == None
+				),
+				{
+					Process.user_uid: user_uid,
+					Process.anonymous_id: None
+				}
+			)
+			RatingStore.bind_anonymous(user_uid, anonymous_id)
+		return binded_count
+
+	@staticmethod
+	def bind_name(name_uid: str, user_uid: str) -> int:
+		"""
+		Bind (set name_uid for unnamed) user processes
+		and return binded process number.
+		"""
+		with Store.unit_of_work():
+			binded_count = Store.update_list(
+				database.session.query(
+					Process
+				).filter(
+					Process.user_uid == user_uid,
+					Process.name_uid == None,
+					Process.deleted_utc == None
+				),
+				{
+					Process.name_uid: name_uid
+				}
+			)
+			RatingStore.bind_name(name_uid, user_uid)
 		return binded_count
 
 	@staticmethod
@@ -175,113 +213,159 @@ class ProcessStore(Store):
 		)
 
 	@staticmethod
-	def read_with_test(uid: str,
-										 result_expression = literal(0),
-										 crammers_expression = literal(0)):
+	def read_with_test(uid: str):
 		"""
 		Return process with test data.
 		"""
 		return database.session.query(
-			Process, Test,
-			cast(result_expression, sqlalchemy.Integer),
-			cast(crammers_expression, sqlalchemy.Integer)
+			Process, Test
 		).join(
 			Test
 		).filter(
  			uid == Process.uid
 		).first()
 
+	@staticmethod
+	def read_player_state(uid: str):
+		"""
+		Return process with test data, pending (not answered) task
+		and last answered task within one query.
+		"""
+		pending_task = aliased(Task)
+		passed_task = aliased(Task)
+		pending_task_id = _get_last_task_id_query(None)
+		passed_task_id = _get_last_task_id_query(True)
+		return database.session.query(
+			Process, Test, pending_task, passed_task
+		).join(
+			Test
+		).outerjoin(
+			pending_task, and_(
+				pending_task.id == pending_task_id,
+				pending_task.answer == None
+			)
+		).outerjoin(
+			passed_task, passed_task.id == passed_task_id
+		).filter(
+			uid == Process.uid
+		).first()
+
+	@staticmethod
+	def backfill_scores() -> int:
+		"""
+		Set result and crammers for completed processes without them
+		and return updated process number.
+		"""
+		answer_count = sqlalchemy.select(
+			[Test.answer_count]
+		).where(
+			Test.id == Process.test_id
+		).as_scalar()
+		answer_time = func.max(Process.answer_time, 1)
+		try:
+			updated_count = database.session.query(
+				Process
+			).filter(
+				Process.result == None,
+				Process.answer_count > 0,
+				Process.answer_count >= answer_count
+			).update(
+				{
+					Process.result: cast(
+						1.0 * Process.correct_count / Process.answer_count * 100 * \
+							func.min(1.0 * Process.limit_time / answer_time, 1.0),
+						sqlalchemy.Integer
+					),
+					Process.crammers: cast(
+						1.0 * Process.correct_count / Process.answer_count * \
+							Process.limit_time / answer_time * Process.correct_count,
+						sqlalchemy.Integer
+					)
+				},
+				synchronize_session=False
+			)
+			Store.commit()
+			return updated_count
+		except:
+			database.session.rollback()
+			raise
+
 	@staticmethod
 	def get_top_crammers(offset: int, limit: int,
 											 filter_extension: str,
 											 filter_user_uid: str,
-											 filter_anonymous_token: str,
+											 filter_anonymous_id: int,
 											 filter_name_uid: str,
-											 crammers_expression,
 											 since: datetime.datetime,
 											 until: datetime.datetime) -> list:
 		pre = _get_crammers_subquery(
-			filter_extension, filter_user_uid, filter_anonymous_token,
-			filter_name_uid, crammers_expression, since, until
+			filter_extension, filter_user_uid, filter_anonymous_id,
+			filter_name_uid, since, until
 		)
 		return database.session.query(
 			pre.c.name_value.label('name'),
-			func.count(pre.c.process_id).label('process_count'),
-			func.sum(pre.c.process_correct_count).label('correct_count'),
-			func.sum(pre.c.process_answer_time).label('answer_time'),
+			func.sum(pre.c.process_count).label('process_count'),
+			func.sum(pre.c.correct_count).label('correct_count'),
+			func.sum(pre.c.answer_time).label('answer_time'),
 			func.sum(pre.c.crammers).label('total'),
 		).filter(
-			pre.c.crammers > 0
+			pre.c.scored == True
 		).group_by(
-			pre.c.name_id
+			pre.c.name_uid
 		).order_by(
 			desc('total'),
-			pre.c.process_modified_local
+			func.max(pre.c.modified_local)
 		).limit(limit).offset(offset).all()
 
 	@staticmethod
 	def get_chart_data(filter_extension: str,
 										 filter_user_uid: str,
-										 filter_anonymous_token: str,
+										 filter_anonymous_id: int,
 										 filter_name_uid: str,
-										 crammers_expression,
 										 since: datetime.datetime,
 										 until: datetime.datetime) -> list:
 		pre = _get_crammers_subquery(
-			filter_extension, filter_user_uid, filter_anonymous_token,
-			filter_name_uid, crammers_expression, since, until
+			filter_extension, filter_user_uid, filter_anonymous_id,
+			filter_name_uid, since, until
 		)
-		pre_local = database.session.query(
-			pre.c.process_correct_count,
-			pre.c.process_answer_time,
-			pre.c.process_id,
-			pre.c.test_id,
-			pre.c.name_value,
-			pre.c.name_id,
-			pre.c.crammers,
-			pre.c.process_modified_local,
+		return database.session.query(
+			pre.c.name_value.label('name_value'),
+			func.sum(pre.c.process_count).label('process_count'),
+			func.sum(pre.c.correct_count).label('correct_count'),
+			func.sum(pre.c.answer_time).label('answer_time'),
+			func.sum(pre.c.crammers).label('total'),
 			func.strftime(
-				'%Y-%m-%d', pre.c.process_modified_local
+				'%Y-%m-%d', pre.c.date_local
 			).label('process_date_local')
-		).subquery()
-		return database.session.query(
-			pre_local.c.name_value.label('name_value'),
-			func.count(pre_local.c.process_id).label('process_count'),
-			func.sum(pre_local.c.process_correct_count).label('correct_count'),
-			func.sum(pre_local.c.process_answer_time).label('answer_time'),
-			func.sum(pre_local.c.crammers).label('total'),
-			pre_local.c.process_date_local
 		).group_by(
-			pre_local.c.name_value,
-			pre_local.c.process_date_local
+			pre.c.name_value,
+			pre.c.date_local
 		).order_by(
-			pre_local.c.process_modified_local
+			func.min(pre.c.modified_local)
 		).all()
 
 	@staticmethod
 	def get_user_crammers(filter_extension: str,
 												filter_user_uid: str,
-												filter_anonymous_token: str,
+												filter_anonymous_id: int,
 												filter_name_uid: str,
-												crammers_expression,
 												since: datetime.datetime,
 												until: datetime.datetime) -> (int, int):
 		pre = _get_crammers_subquery(
-			filter_extension, None, None, None,
-			crammers_expression, since, until
+			filter_extension, None, None, None, since, until
 		)
 		top = database.session.query(
 			pre.c.name_uid.label('name_uid'),
 			pre.c.name_value.label('name'),
-			func.count(pre.c.process_id).label('process_count'),
-			func.sum(pre.c.process_correct_count).label('correct_count'),
-			func.sum(pre.c.process_answer_time).label('answer_time'),
+			func.sum(pre.c.process_count).label('process_count'),
+			func.sum(pre.c.correct_count).label('correct_count'),
+			func.sum(pre.c.answer_time).label('answer_time'),
 			func.sum(pre.c.crammers).label('total'),
-			pre.c.process_modified_local.label('process_modified_local'),
+			func.max(pre.c.modified_local).label('process_modified_local'),
 		).filter(
-			pre.c.crammers > 0
+			pre.c.scored == True
 		).group_by(
-			pre.c.name_id
+			pre.c.name_uid
 		).subquery()
 		row = database.session.query(
 			top.c.name_uid, top.c.name, top.c.total,
@@ -292,26 +376,41 @@ class ProcessStore(Store):
 		).subquery()
 		return database.session.query(
 			row.c.place, row.c.name, row.c.process_count,
-			row.c.correct_count, row.c.answer_time, row.c.total			
+			row.c.correct_count, row.c.answer_time, row.c.total
 		).filter(
 			True if filter_name_uid is None else \
 				filter_name_uid == row.c.name_uid
 		).first()
 
 
+def _get_last_task_id_query(filter_answered: bool):
+	"""
+	Return correlated to process scalar query for last modified task id.
+	"""
+	return sqlalchemy.select(
+		[Task.id]
+	).where(
+		and_(
+			Task.process_id == Process.id,
+			True if filter_answered is None else \
+				Task.answer != None,
+			Task.deleted_utc == None
+		)
+	).order_by(
+		Task.modified_utc.desc()
+	).limit(1).correlate(Process).as_scalar()
+
+
 def _get_list_query(filter_test_uid: str,
 										filter_hide_completed: bool,
-										filter_user_uid: str, filter_anonymous_token: str,
-										filter_name_uid: str,
-										result_expression, crammers_expression):
+										filter_user_uid: str, filter_anonymous_id: int,
+										filter_name_uid: str):
 	"""
 	Return query object for process.
 	"""
 	if filter_name_uid is None:
 		pre = database.session.query(
-			Process, Test, Name,
-			cast(result_expression, sqlalchemy.Integer),
-			cast(crammers_expression, sqlalchemy.Integer)
+			Process, Test, Name
 		).join(
 			Test
 		).outerjoin(
@@ -319,9 +418,7 @@ def _get_list_query(filter_test_uid: str,
 		)
 	else:
 		pre = database.session.query(
-			Process, Test, Name,
-			cast(result_expression, sqlalchemy.Integer),
-			cast(crammers_expression, sqlalchemy.Integer)
+			Process, Test, Name
 		).join(
 			Test
 		).join(
@@ -335,8 +432,8 @@ def _get_list_query(filter_test_uid: str,
 				Process.answer_count < Test.answer_count,
 		True if filter_user_uid is None else \
 			filter_user_uid == Process.user_uid,
-		True if filter_anonymous_token is None else \
-			filter_anonymous_token == Process.anonymous_token,
+		True if filter_anonymous_id is None else \
+			filter_anonymous_id == Process.anonymous_id,
 		True if filter_name_uid is None else \
 			filter_name_uid == Process.name_uid,
 		Process.deleted_utc == None
@@ -347,42 +444,41 @@ def _get_list_query(filter_test_uid: str,
 
 def _get_crammers_subquery(filter_extension: str,
 													 filter_user_uid: str,
-													 filter_anonymous_token: str,
+													 filter_anonymous_id: int,
 													 filter_name_uid: str,
-													 crammers_expression,
 													 since: datetime.datetime,
 													 until: datetime.datetime):
+	"""
+	Return subquery object for rating (daily rollup of completed processes,
+	scored rows are taken for crammers top only).
+	"""
 	return database.session.query(
-		Process.correct_count.label('process_correct_count'),
-		Process.answer_time.label('process_answer_time'),
-		Process.id.label('process_id'),
-		Test.extension.label('test_extension'),
-		Test.id.label('test_id'),
-		Name.value.label('name_value'),
-		Name.id.label('name_id'),
-		(cast(crammers_expression, sqlalchemy.Integer)).label('crammers'),
-		(Process.modified_local).label('process_modified_local'),
-		Name.uid.label('name_uid')
-	).join(
-		Test
+		Rating.date_local.label('date_local'),
+		Rating.process_count.label('process_count'),
+		Rating.correct_count.label('correct_count'),
+		Rating.answer_time.label('answer_time'),
+		Rating.crammers.label('crammers'),
+		Rating.scored.label('scored'),
+		Rating.modified_local.label('modified_local'),
+		Rating.name_uid.label('name_uid'),
+		Name.value.label('name_value')
 	).outerjoin(
-		Name, Name.uid == Process.name_uid
+		Name, Name.uid == Rating.name_uid
 	).filter(
 		True if filter_extension is None else \
-			Test.extension.ilike('%' + filter_extension + '%'),
+			Rating.extension.ilike('%' + filter_extension + '%'),
 		True if filter_user_uid is None else \
-				filter_user_uid == Process.user_uid,
+				filter_user_uid == Rating.user_uid,
 		True if filter_user_uid is not None or \
-			filter_anonymous_token is not None else \
-				Process.name_uid != None,
-		Process.anonymous_token == filter_anonymous_token,
+			filter_anonymous_id is not None else \
+				Rating.name_uid != None,
+		Rating.anonymous_id == filter_anonymous_id,
 		True if filter_name_uid is None else \
-			filter_name_uid == Process.name_uid,
+			filter_name_uid == Rating.name_uid,
 		and_(
-			Process.modified_local >= since,
-			Process.modified_local < until
+			Rating.date_local >= since.date(),
+			Rating.date_local < until.date()
 		) if since is not None else \
-			Process.modified_local < until,
-		Process.answer_count == Test.answer_count,
-		Test.deleted_utc == None
+			Rating.date_local < until.date(),
+		Rating.deleted_utc == None
 	).subquery()
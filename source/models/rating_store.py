@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+
+'''
+Store module for Rating entity.
+'''
+
+# Standard libraries import
+import datetime
+
+# Additional libraries import
+from sqlalchemy import case
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+# Application modules import
+from models import database
+from models.__base__ import Store
+from models.entity.rating import Rating
+from models.entity.rating import get_rollup_key
+from models.entity.process import Process
+from models.entity.test import Test
+from models.entity.tombstone import Tombstone
+
+
+class RatingStore(Store):
+	"""
+	This is a rating store class.
+	"""
+
+	@staticmethod
+	def add_process(process: Process, extension: str) -> None:
+		"""
+		Add completed process to rating (daily rollup).
+		Rating is added to the session only, commit is up to the caller.
+		"""
+		_apply_process(process, extension, 1)
+
+	@staticmethod
+	def add_test(test: Test) -> int:
+		"""
+		Add completed processes of test to rating (daily rollup)
+		and return added process number.
+		Ratings are added to the session only, commit is up to the caller.
+		"""
+		return _apply_test(test, 1)
+
+	@staticmethod
+	def remove_test(test: Test) -> int:
+		"""
+		Remove completed processes of test from rating (daily rollup)
+		and return removed process number.
+		Ratings are added to the session only, commit is up to the caller.
+		"""
+		return _apply_test(test, -1)
+
+	@staticmethod
+	def bind_anonymous(user_uid: str, anonymous_id: int) -> int:
+		"""
+		Bind (replace anonymous_id with user_uid) ratings
+		and return binded rating number.
+		"""
+		if anonymous_id is None:
+			return 0
+		return _move_ratings(
+			database.session.query(
+				Rating
+			).filter(
+				Rating.anonymous_id == anonymous_id
+			),
+			user_uid=user_uid,
+			anonymous_id=None
+		)
+
+	@staticmethod
+	def bind_name(name_uid: str, user_uid: str) -> int:
+		"""
+		Bind (set name_uid for unnamed) user ratings
+		and return binded rating number.
+		"""
+		return _move_ratings(
+			database.session.query(
+				Rating
+			).filter(
+				Rating.user_uid == user_uid,
+				Rating.name_uid == None
+			),
+			name_uid=name_uid
+		)
+
+	@staticmethod
+	def rebuild() -> int:
+		"""
+		Rebuild rating from completed processes (result and crammers
+		should be backfilled, ValueError is raised otherwise,
+		replaced rows are tombstoned) and return number of processes
+		taken into account.
+		"""
+		query = database.session.query(
+			Process, Test
+		).join(
+			Test
+		).filter(
+			Process.answer_count == Test.answer_count,
+			Test.deleted_utc == None
+		)
+		if query.filter(Process.crammers == None).first() is not None:
+			raise ValueError('Scores are not backfilled for completed processes.')
+		try:
+			database.session.add_all(
+				Tombstone(Rating.__tablename__, uid)
+				for uid, in database.session.query(Rating.uid)
+			)
+			database.session.query(Rating).delete(synchronize_session=False)
+			ratings = {}
+			process_count = 0
+			for process, test in query.yield_per(1000):
+				key = _get_process_key(process, test.extension)
+				rating = ratings.get(get_rollup_key(*key))
+				if rating is None:
+					rating = Rating(*key)
+					ratings[rating.rollup_key] = rating
+				_add_values(rating, _get_process_values(process, 1))
+				process_count += 1
+			database.session.add_all(ratings.values())
+			Store.commit()
+			return process_count
+		except:
+			database.session.rollback()
+			raise
+
+
+def _apply_test(test: Test, sign: int) -> int:
+	"""
+	Add (sign = 1) or subtract (sign = -1) completed processes of test
+	and return process number.
+	"""
+	process_count = 0
+	for process in database.session.query(
+				Process
+			).filter(
+				Process.test_id == test.id,
+				Process.answer_count == test.answer_count
+			).all():
+		_apply_process(process, test.extension, sign)
+		process_count += 1
+	return process_count
+
+
+def _apply_process(process: Process, extension: str, sign: int) -> None:
+	"""
+	Add (sign = 1) or subtract (sign = -1) process values to rating row
+	matched by local day, extension, scored, name and owner.
+	"""
+	_increment_rating(
+		_get_process_key(process, extension), _get_process_values(process, sign))
+
+
+def _get_process_key(process: Process, extension: str) -> list:
+	"""
+	Return rating key values (local day, extension, scored, name and owner)
+	of process (scored process has crammers).
+	"""
+	return [
+		process.modified_local.date(), extension, (process.crammers or 0) > 0,
+		process.name_uid, process.user_uid, process.anonymous_id
+	]
+
+
+def _get_process_values(process: Process, sign: int) -> dict:
+	"""
+	Return rating values added (sign = 1) or subtracted (sign = -1)
+	by process (modified_local is taken into account on adding only).
+	"""
+	return {
+		'process_count': sign,
+		'correct_count': sign * process.correct_count,
+		'answer_time': sign * process.answer_time,
+		'crammers': sign * (process.crammers or 0),
+		'modified_local': process.modified_local if sign > 0 else None
+	}
+
+
+def _add_values(rating: Rating, values: dict) -> None:
+	"""
+	Add values to rating object (not stored yet).
+	"""
+	rating.process_count += values['process_count']
+	rating.correct_count += values['correct_count']
+	rating.answer_time += values['answer_time']
+	rating.crammers += values['crammers']
+	if values['modified_local'] is not None and \
+			(rating.modified_local is None or \
+				rating.modified_local < values['modified_local']):
+		rating.modified_local = values['modified_local']
+
+
+def _increment_rating(key: list, values: dict) -> None:
+	"""
+	Add values to rating row matched by key within one increment statement
+	(missed row is inserted first, unique rollup key makes concurrent
+	insert fail within savepoint and the concurrent row is incremented).
+	"""
+	rollup_key = get_rollup_key(*key)
+	if _update_rating(rollup_key, values) == 1:
+		return
+	try:
+		with database.session.begin_nested():
+			database.session.add(Rating(*key))
+	except IntegrityError:
+		pass # Inserted by concurrent transaction
+	_update_rating(rollup_key, values)
+
+
+def _update_rating(rollup_key: str, values: dict) -> int:
+	"""
+	Increment rating row matched by rollup key and return updated row number.
+	"""
+	update = {
+		Rating.process_count: Rating.process_count + values['process_count'],
+		Rating.correct_count: Rating.correct_count + values['correct_count'],
+		Rating.answer_time: Rating.answer_time + values['answer_time'],
+		Rating.crammers: Rating.crammers + values['crammers'],
+		Rating.modified_utc: datetime.datetime.utcnow()
+	}
+	if values['modified_local'] is not None:
+		update[Rating.modified_local] = case(
+			[
+				(
+					or_(
+						Rating.modified_local == None,
+						Rating.modified_local < values['modified_local']
+					),
+					values['modified_local']
+				)
+			],
+			else_=Rating.modified_local
+		)
+	return database.session.query(
+		Rating
+	).filter(
+		Rating.rollup_key == rollup_key
+	).update(update, synchronize_session=False)
+
+
+def _move_ratings(query, **key_values) -> int:
+	"""
+	Move (merge into rows with key values replaced) ratings of query
+	and return moved rating number (rows are merged by rollup key,
+	so set-based update could collide with existing rows,
+	merged rows are deleted and tombstoned).
+	"""
+	try:
+		moved_count = 0
+		for rating in query.all():
+			key = [
+				key_values.get(name, getattr(rating, name)) for name in [
+					'date_local', 'extension', 'scored',
+					'name_uid', 'user_uid', 'anonymous_id'
+				]
+			]
+			values = {
+				'process_count': rating.process_count,
+				'correct_count': rating.correct_count,
+				'answer_time': rating.answer_time,
+				'crammers': rating.crammers,
+				'modified_local': rating.modified_local
+			}
+			database.session.add(Tombstone(Rating.__tablename__, rating.uid))
+			database.session.delete(rating)
+			database.session.flush()
+			_increment_rating(key, values)
+			moved_count += 1
+		Store.commit()
+		return moved_count
+	except:
+		database.session.rollback()
+		raise
@@ -62,16 +62,18 @@ class TaskStore(Store):
 
 	@staticmethod
 	def read_list(offset: int, limit: int,
-							  filter_process_id: int
-								) -> list:
+							  filter_process_id: int,
+								cursor: str = None) -> list:
 		"""
-		Return list of tasks by arguments.
+		Return list of tasks by arguments (next to cursor if defined).
 		"""
 		list_query = _get_list_query(
 			filter_process_id
 		)
-		return list_query.limit(limit).offset(offset).all() \
-			if offset > 0 and limit > 0 else list_query.all()
+		return super(TaskStore, TaskStore).paginate(
+			list_query, Task, offset, limit, cursor
+		) if cursor is not None or (offset > 0 and limit > 0) \
+			else list_query.all()
 
 	@staticmethod
 	def count_list(filter_process_id: int) -> int:
@@ -8,10 +8,10 @@ Store module for Test entity.
 from models import database
 from models.__base__ import Store
 from models.entity.test import Test
+from models.rating_store import RatingStore
 
 # Additional libraries import
 from sqlalchemy import or_
-from sqlalchemy import func
 
 class TestStore(Store):
 	"""
@@ -48,7 +48,11 @@ class TestStore(Store):
 		test = TestStore.read(uid)
 		test.name = name
 		test.extension_options = extension_options
-		test.answer_count = answer_count
+		if test.answer_count != answer_count:
+			# Processes completion depends on answer count (rebind rating)
+			RatingStore.remove_test(test)
+			test.answer_count = answer_count
+			RatingStore.add_test(test)
 		return super(TestStore, TestStore).update(
 			test
 		)
@@ -58,35 +62,68 @@ class TestStore(Store):
 		"""
 		Delete and return test.
 		"""
+		test = TestStore.read(uid)
+		RatingStore.remove_test(test)
 		return super(TestStore, TestStore).delete(
-			TestStore.read(uid)
+			test
+		)
+
+	@staticmethod
+	def rand(filter_extension: str = None, filter_user_uid: str = None,
+					 filter_admin_user_uid_list: list = None) -> Test:
+		"""
+		Return random test (only not deleted) by arguments
+		(all tests are taken if admin user uid list is undefined).
+		"""
+		if filter_admin_user_uid_list is None:
+			query = database.session.query(
+				Test
+			).filter(
+				True if filter_extension is None else \
+					Test.extension.ilike('%' + filter_extension + '%'),
+				Test.deleted_utc == None
+			)
+		else:
+			query = _get_list_query(
+				None, filter_extension, filter_user_uid,
+				filter_admin_user_uid_list
+			)
+		return super(TestStore, TestStore).rand(
+			query, Test
 		)
 
 	@staticmethod
-	def rand() -> Test:
+	def read_list(offset: int, limit: int,
+								filter_name: str, filter_extension: str,
+								filter_user_uid: str,
+								filter_admin_user_uid_list: list,
+								cursor: str = None) -> list:
 		"""
-		Return random test (only not deleted).
+		Return list of tests by arguments (next to cursor if defined).
 		"""
-		return database.session.query(
-			Test
-		).filter(
-			Test.deleted_utc == None
-		).order_by(
-			func.random()
-		).first()
+		return super(TestStore, TestStore).paginate(
+			_get_list_query(
+				filter_name, filter_extension, filter_user_uid,
+				filter_admin_user_uid_list
+			), Test, offset, limit, cursor
+		)
 
 	@staticmethod
-	def read_list(offset: int, limit: int,
+	def read_page(offset: int, limit: int,
 								filter_name: str, filter_extension: str,
 								filter_user_uid: str,
-								filter_admin_user_uid_list: list) -> list:
+								filter_admin_user_uid_list: list,
+								cursor: str = None) -> (list, int):
 		"""
-		Return list of tests by arguments.
+		Return list of tests by arguments (next to cursor if defined)
+		and number of tests in list.
 		"""
-		return _get_list_query(
-			filter_name, filter_extension, filter_user_uid,
-			filter_admin_user_uid_list
-		).limit(limit).offset(offset).all()
+		return super(TestStore, TestStore).read_page(
+			_get_list_query(
+				filter_name, filter_extension, filter_user_uid,
+				filter_admin_user_uid_list
+			), Test, offset, limit, cursor
+		)
 
 	@staticmethod
 	def count_list(filter_name: str, filter_extension: str,
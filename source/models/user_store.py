@@ -56,14 +56,16 @@ class UserStore(Store):
 
 	@staticmethod
 	def read_list(offset: int, limit: int,
-							  filter_name: str
-								) -> list:
+							  filter_name: str,
+								cursor: str = None) -> list:
 		"""
-		Return list of users by arguments.
+		Return list of users by arguments (next to cursor if defined).
 		"""
-		return _get_list_query(
-			filter_name
-		).limit(limit).offset(offset).all()
+		return super(UserStore, UserStore).paginate(
+			_get_list_query(
+				filter_name
+			), User, offset, limit, cursor
+		)
 
 	@staticmethod
 	def count_list(filter_name: str) -> int:
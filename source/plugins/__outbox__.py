@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+"""
+Helper module to handle persistent (SQLite) outbox queue
+for identica notifications.
+"""
+
+# Standard libraries import
+import os
+import json
+import time
+import sqlite3
+
+# Application modules import
+from plugins.__sqlite__ import get_connection as get_sqlite_connection
+
+# Application constants
+OUTBOX_PATH = os.path.join(os.path.dirname(__file__), 'identica.db')
+STATUS_PENDING = 'pending'
+STATUS_SENDING = 'sending'
+STATUS_SENT = 'sent'
+STATUS_FAILED = 'failed'
+CLAIM_SECONDS = 60 # Claimed (sending) items are dequeued again after timeout
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 2 # Retry delay doubled on every attempt
+BACKOFF_MAX_SECONDS = 300
+OUTBOX_SCHEMA = [
+	'CREATE TABLE IF NOT EXISTS outbox ('
+		'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+		'kind TEXT NOT NULL, '
+		'data TEXT NOT NULL, '
+		'status TEXT NOT NULL, '
+		'attempts INTEGER NOT NULL DEFAULT 0, '
+		'available_at REAL NOT NULL, '
+		'created_at REAL NOT NULL, '
+		'sent_at REAL, '
+		'error TEXT'
+	')',
+	'CREATE INDEX IF NOT EXISTS ix_outbox_status_available_at '
+		'ON outbox (status, available_at)'
+]
+
+
+def get_connection() -> sqlite3.Connection:
+	"""
+	Return outbox connection (one per path, thread and process).
+	"""
+	return get_sqlite_connection(OUTBOX_PATH, OUTBOX_SCHEMA)
+
+
+def enqueue(kind: str, data: dict) -> int:
+	"""
+	Add item (kind and JSON data) to outbox and return item id.
+	"""
+	now = time.time()
+	return get_connection().execute(
+		'INSERT INTO outbox (kind, data, status, available_at, created_at) '
+		'VALUES (?, ?, ?, ?, ?)',
+		(kind, json.dumps(data, ensure_ascii=False), STATUS_PENDING, now, now)
+	).lastrowid
+
+
+def dequeue(limit: int) -> list:
+	"""
+	Claim and return list of available items (id, kind, data, attempts)
+	ordered by id (claim expires in CLAIM_SECONDS and is counted
+	as attempt, so item with expired claims is failed after MAX_ATTEMPTS).
+	"""
+	now = time.time()
+	connection = get_connection()
+	connection.execute('BEGIN IMMEDIATE')
+	try:
+		connection.execute(
+			'UPDATE outbox SET status = ?, error = ? '
+			'WHERE status = ? AND available_at <= ? AND attempts >= ?',
+			(
+				STATUS_FAILED, 'Claim expired after %d attempts' % MAX_ATTEMPTS,
+				STATUS_SENDING, now, MAX_ATTEMPTS
+			)
+		)
+		items = connection.execute(
+			'SELECT id, kind, data, attempts FROM outbox '
+			'WHERE status IN (?, ?) AND available_at <= ? '
+			'ORDER BY id LIMIT ?',
+			(STATUS_PENDING, STATUS_SENDING, now, limit)
+		).fetchall()
+		connection.executemany(
+			'UPDATE outbox SET status = ?, attempts = attempts + 1, '
+			'available_at = ? WHERE id = ?',
+			[(STATUS_SENDING, now + CLAIM_SECONDS, item[0]) for item in items]
+		)
+		connection.execute('COMMIT')
+	except:
+		connection.execute('ROLLBACK')
+		raise
+	return [
+		(id, kind, json.loads(data), attempts + 1)
+		for id, kind, data, attempts in items
+	]
+
+
+def complete(id: int) -> None:
+	"""
+	Mark item as sent.
+	"""
+	get_connection().execute(
+		'UPDATE outbox SET status = ?, sent_at = ?, error = NULL WHERE id = ?',
+		(STATUS_SENT, time.time(), id)
+	)
+
+
+def fail(id: int, attempts: int, error: str) -> None:
+	"""
+	Reschedule item with exponential backoff or mark item as failed
+	after MAX_ATTEMPTS attempts (counted by claims already).
+	"""
+	get_connection().execute(
+		'UPDATE outbox SET status = ?, attempts = ?, available_at = ?, '
+		'error = ? WHERE id = ?',
+		(
+			STATUS_FAILED if attempts >= MAX_ATTEMPTS else STATUS_PENDING,
+			attempts,
+			time.time() + min(
+				BACKOFF_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS),
+			str(error)[:1000],
+			id
+		)
+	)
+
+
+def get_metrics(since_seconds: int = 3600) -> dict:
+	"""
+	Return outbox metrics (item number by status, oldest pending age
+	and average delivery latency of items sent since seconds).
+	"""
+	now = time.time()
+	connection = get_connection()
+	metrics = {
+		status: count for status, count in connection.execute(
+			'SELECT status, COUNT(*) FROM outbox GROUP BY status')
+	}
+	oldest, = connection.execute(
+		'SELECT MIN(created_at) FROM outbox WHERE status IN (?, ?)',
+		(STATUS_PENDING, STATUS_SENDING)
+	).fetchone()
+	metrics['oldest_pending_seconds'] = \
+		round(now - oldest, 3) if oldest is not None else 0
+	sent_count, latency = connection.execute(
+		'SELECT COUNT(*), AVG(sent_at - created_at) FROM outbox '
+		'WHERE status = ? AND sent_at >= ?',
+		(STATUS_SENT, now - since_seconds)
+	).fetchone()
+	metrics['sent_recently'] = sent_count
+	metrics['latency_seconds'] = round(latency or 0, 3)
+	return metrics
+
+
+def purge(older_seconds: int) -> int:
+	"""
+	Delete sent items older than seconds and return deleted item number.
+	"""
+	return get_connection().execute(
+		'DELETE FROM outbox WHERE status = ? AND sent_at < ?',
+		(STATUS_SENT, time.time() - older_seconds)
+	).rowcount
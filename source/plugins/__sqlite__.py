@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+"""
+Helper module to handle shared (SQLite) connections for plugins
+(outbox queue and token store).
+"""
+
+# Standard libraries import
+import os
+import sqlite3
+import threading
+
+# Application constants
+CONNECT_TIMEOUT = 10
+
+_local = threading.local()
+
+
+def get_connection(path: str, schema: list) -> sqlite3.Connection:
+	"""
+	Return connection to database by path (one per path, thread and process)
+	with schema statements applied (once per connection).
+	"""
+	if getattr(_local, 'pid', None) != os.getpid():
+		_local.connections = {}
+		_local.pid = os.getpid()
+	connection, schemas = _local.connections.get(path, (None, None))
+	if connection is None:
+		connection = sqlite3.connect(
+			path, timeout=CONNECT_TIMEOUT, isolation_level=None)
+		connection.execute('PRAGMA journal_mode = WAL')
+		connection.execute('PRAGMA synchronous = NORMAL')
+		schemas = set()
+		_local.connections[path] = connection, schemas
+	if id(schema) not in schemas:
+		for statement in schema:
+			connection.execute(statement)
+		schemas.add(id(schema))
+	return connection
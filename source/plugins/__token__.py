@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""
+Helper module to handle shared (SQLite) token store with expiry
+for identica sign-in (url tokens and pins).
+"""
+
+# Standard libraries import
+import json
+import time
+import sqlite3
+
+# Application modules import
+from plugins.__sqlite__ import get_connection as get_sqlite_connection
+from plugins.__outbox__ import OUTBOX_PATH
+
+# Application constants
+TOKEN_PATH = OUTBOX_PATH # Same database for bot and web application
+WAIT_SECONDS = 0.2 # Change check interval while waiting for confirmation
+TOKEN_SCHEMA = [
+	'CREATE TABLE IF NOT EXISTS token ('
+		'kind TEXT NOT NULL, '
+		'token TEXT NOT NULL, '
+		'data TEXT NOT NULL, '
+		'password TEXT, '
+		'confirmed INTEGER NOT NULL DEFAULT 0, '
+		'expires_at REAL NOT NULL, '
+		'PRIMARY KEY (kind, token)'
+	')',
+	'CREATE INDEX IF NOT EXISTS ix_token_expires_at ON token (expires_at)'
+]
+
+
+def get_connection() -> sqlite3.Connection:
+	"""
+	Return token store connection (one per path, thread and process).
+	"""
+	return get_sqlite_connection(TOKEN_PATH, TOKEN_SCHEMA)
+
+
+def create_token(kind: str, token: str, data: dict,
+								 valid_seconds: int, password: str = None) -> bool:
+	"""
+	Add token (kind, token, JSON data and optional password) valid
+	for seconds and return True (False if valid token already exists).
+	"""
+	now = time.time()
+	connection = get_connection()
+	connection.execute('BEGIN IMMEDIATE')
+	try:
+		connection.execute(
+			'DELETE FROM token WHERE kind = ? AND token = ? AND expires_at <= ?',
+			(kind, token, now)
+		)
+		created = connection.execute(
+			'INSERT OR IGNORE INTO token '
+			'(kind, token, data, password, expires_at) VALUES (?, ?, ?, ?, ?)',
+			(
+				kind, token, json.dumps(data, ensure_ascii=False),
+				password, now + valid_seconds
+			)
+		).rowcount == 1
+		connection.execute('COMMIT')
+	except:
+		connection.execute('ROLLBACK')
+		raise
+	return created
+
+
+def read_token(kind: str, token: str) -> tuple:
+	"""
+	Return valid token (data, password, confirmed) or return null.
+	"""
+	row = get_connection().execute(
+		'SELECT data, password, confirmed FROM token '
+		'WHERE kind = ? AND token = ? AND expires_at > ?',
+		(kind, token, time.time())
+	).fetchone()
+	if row is None:
+		return
+	data, password, confirmed = row
+	return json.loads(data), password, bool(confirmed)
+
+
+def wait_token(kind: str, token: str, timeout: float) -> tuple:
+	"""
+	Wait (up to timeout seconds) for valid token to be confirmed and return
+	token (data, password, confirmed) or return null for invalid token.
+	Token is re-read only after commits by other connections (data_version).
+	"""
+	connection = get_connection()
+	deadline = time.time() + timeout
+	version = None
+	while True:
+		current_version, = connection.execute('PRAGMA data_version').fetchone()
+		if current_version != version:
+			version = current_version
+			row = read_token(kind, token)
+			if row is None or row[2]:
+				return row
+		if time.time() >= deadline:
+			return read_token(kind, token) # Expired tokens are not committed
+		time.sleep(WAIT_SECONDS)
+
+
+def confirm_token(kind: str, token: str, password: str) -> bool:
+	"""
+	Confirm valid token by password and return True on success
+	(token is deleted on wrong password).
+	"""
+	now = time.time()
+	connection = get_connection()
+	if connection.execute(
+				'UPDATE token SET confirmed = 1 WHERE kind = ? AND token = ? '
+				'AND password = ? AND expires_at > ?',
+				(kind, token, password, now)
+			).rowcount == 1:
+		return True
+	delete_token(kind, token)
+	return False
+
+
+def consume_token(kind: str, token: str,
+									confirmed_only: bool = False) -> tuple:
+	"""
+	Return valid token (data, confirmed) and delete it (unconfirmed token
+	is kept for confirmed_only) or return null (deleted concurrently too).
+	"""
+	row = read_token(kind, token)
+	if row is None:
+		return
+	data, _, confirmed = row
+	if confirmed_only and not confirmed:
+		return data, confirmed
+	if get_connection().execute(
+				'DELETE FROM token WHERE kind = ? AND token = ? AND expires_at > ?',
+				(kind, token, time.time())
+			).rowcount != 1:
+		return # Consumed by other request
+	return data, confirmed
+
+
+def delete_token(kind: str, token: str) -> None:
+	"""
+	Delete token.
+	"""
+	get_connection().execute(
+		'DELETE FROM token WHERE kind = ? AND token = ?', (kind, token))
+
+
+def purge_tokens() -> int:
+	"""
+	Delete expired tokens and return deleted token number.
+	"""
+	return get_connection().execute(
+		'DELETE FROM token WHERE expires_at <= ?', (time.time(),)
+	).rowcount
@@ -7,16 +7,61 @@ Module to handle database plugin.
 # Standard libraries import
 import os
 import csv
+import gzip
+import json
+import sqlite3
+import itertools
 import logging
 import datetime
+import time
 import uuid
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Application modules import
 from models import database
+from models.entity.tombstone import Tombstone
 
 # Additional libraries import
 import sqlalchemy
 
+# Rows fetched (and written) per chunk
+CHUNK_SIZE = 1000
+# Chunks buffered per table between file and database threads
+# and seconds between cancel checks of blocked thread
+QUEUE_CHUNKS = 4
+QUEUE_SECONDS = 0.5
+# Seconds between progress reports
+PROGRESS_SECONDS = 5
+# Import progress (committed rows number) file extension
+PROGRESS_FILE_EXT = '.progress'
+# SQLite pragmas relaxed within bulk load (rollback journal is kept
+# on disk, so interrupted bulk load does not corrupt database file)
+BULK_PRAGMAS = [('synchronous', 'NORMAL')]
+# Indexes dropped by bulk load file (recreated by next import if interrupted)
+BULK_INDEXES_JSON = 'bulk_indexes.json'
+# Incremental export watermarks (last exported modified_utc by table) file,
+# delta (rows modified since watermark) and tombstones (uids of rows
+# hard deleted since watermark) file suffixes
+WATERMARK_JSON = 'watermark.json'
+DELTA_SUFFIX = '.delta'
+TOMBSTONES_SUFFIX = '.tombstones'
+# Seconds below watermark exported again (modified_utc is set before commit,
+# so rows committed after export could be older than watermark)
+WATERMARK_OVERLAP_SECONDS = 60
+# SQLite (before 3.32) limits statement variables by 999
+MAX_VARIABLES = 900
+# Export file formats (extensions) and compressed format extension
+FORMATS = ['csv', 'csv.gz', 'jsonl', 'jsonl.gz']
+GZIP_EXT = '.gz'
+# SQLite online backup pages copied per step and pause between steps,
+# seconds to wait for exclusive lock and journal files of replaced database
+BACKUP_PAGES = 256
+BACKUP_SLEEP = 0.01
+BACKUP_TIMEOUT = 30
+SQLITE_JOURNAL_SUFFIXES = ['-journal', '-wal', '-shm']
+
 
 class Plugin():
 	"""
@@ -24,64 +69,881 @@ class Plugin():
 	"""
 	target_path = None
 	table_list = None
+	chunk_size = None
+	bulk = None
+	incremental = None
+	workers = None
+	file_format = None
 
-	def __init__(self, target_path: str, table_list: list) -> "Plugin":
+	def __init__(self, target_path: str, table_list: list = None,
+							 chunk_size: int = CHUNK_SIZE, bulk: bool = False,
+							 incremental: bool = False, workers: int = 1,
+							 file_format: str = FORMATS[0]) -> "Plugin":
 		"""
 		Initiate Plugin object.
 		"""
 		self.target_path = target_path
 		self.table_list = table_list
+		self.chunk_size = chunk_size
+		self.bulk = bulk
+		self.incremental = incremental
+		self.workers = workers
+		self.file_format = file_format
 
 	def export_csv(self) -> None:
 		"""
-		Export data from database.
+		Export data from database (streamed by chunks, all tables
+		are read within one snapshot transaction, files are written
+		by workers concurrently with reading, only rows modified
+		and uids of rows hard deleted since stored watermark
+		(within overlap window) are exported in incremental mode).
 		"""
 		metadata = sqlalchemy.MetaData()
 		metadata.bind = database.engine
-		for table in self.table_list:
-			sql_table = sqlalchemy.Table(table, metadata, autoload=True)
-			sql_select = sqlalchemy.sql.select([sql_table])
-			with database.engine.connect() as connection:
-				sql_result = connection.execute(sql_select)
-				csv_filepath = os.path.join(self.target_path, '%s.csv' % table)
-				with open(csv_filepath, 'w') as csv_file:
-					csv_writer = csv.writer(csv_file)
-					csv_writer.writerow(sql_result.keys())
-					csv_writer.writerows(sql_result)
-			print('Table "%s" exported to "%s"' % (table, csv_filepath))
+		sql_table_list = [
+			sqlalchemy.Table(table, metadata, autoload=True)
+			for table in self.table_list
+		]
+		watermark_filepath = os.path.join(self.target_path, WATERMARK_JSON)
+		watermarks = read_watermarks(watermark_filepath) \
+			if self.incremental else {}
+		timings = {}
+		with database.engine.connect() as connection:
+			transaction = begin_snapshot(connection)
+			try:
+				if self.workers > 1:
+					with ThreadPoolExecutor(self.workers) as executor:
+						futures = [
+							self.export_table(
+								connection, sql_table, watermarks, timings, executor)
+							for sql_table in sql_table_list
+						]
+						for future in futures:
+							future.result()
+				else:
+					for sql_table in sql_table_list:
+						self.export_table(connection, sql_table, watermarks, timings)
+			finally:
+				transaction.rollback()
+		if self.incremental:
+			write_watermarks(watermark_filepath, watermarks)
+		print_timings(sql_table_list, timings, 'exported')
+
+	def export_table(self, connection, sql_table, watermarks: dict,
+									 timings: dict, executor: object = None) -> object:
+		"""
+		Export data from database table to file (written by executor
+		worker if defined, future is returned then).
+		"""
+		started = time.time()
+		table = sql_table.name
+		sql_select = sqlalchemy.sql.select([sql_table])
+		modified_column = sql_table.c.get('modified_utc')
+		if self.incremental and modified_column is not None:
+			sql_select = filter_modified(
+				connection, sql_select, modified_column, table, watermarks)
+		if self.incremental and table != Tombstone.__tablename__ and \
+				'uid' in sql_table.c:
+			self.export_tombstones(connection, table, watermarks)
+		sql_result = connection.execution_options(
+			stream_results=True).execute(sql_select)
+		chunks = iter(lambda: sql_result.fetchmany(self.chunk_size), [])
+		try:
+			if executor is None:
+				return self.write_file(
+					sql_table, sql_result.keys(), timings, started, chunks)
+			chunk_queue = ChunkQueue()
+			future = executor.submit(
+				chunk_queue.consume, self.write_file,
+				sql_table, sql_result.keys(), timings, started
+			)
+			chunk_queue.feed(chunks)
+			return future
+		finally:
+			sql_result.close()
+
+	def write_file(self, sql_table, keys: list, timings: dict,
+								 started: float, chunks) -> None:
+		"""
+		Write chunks (iterable) of table rows to file.
+		"""
+		table = sql_table.name
+		filepath = self.get_filepath(table)
+		with open_file(filepath, 'w') as export_file:
+			write_rows = get_rows_writer(
+				export_file, self.file_format, sql_table, keys)
+			row_count = 0
+			progress = Progress('Table "%s"' % table, 'exported')
+			for rows in chunks:
+				write_rows(rows)
+				row_count += len(rows)
+				progress.report(row_count)
+		progress.report(row_count, force=True)
+		timings[table] = (row_count, time.time() - started)
+		print('Table "%s" exported to "%s" (%d rows)' % (
+			table, filepath, row_count))
+
+	def export_tombstones(self, connection, table: str,
+												watermarks: dict) -> None:
+		"""
+		Export uids of table rows hard deleted since tombstones watermark
+		(within the same snapshot) to propagate them by incremental import.
+		"""
+		sql_tombstone = Tombstone.__table__
+		sql_select = filter_modified(
+			connection,
+			sqlalchemy.sql.select(
+				[sql_tombstone.c.row_uid]
+			).where(
+				sql_tombstone.c.table_name == table
+			),
+			sql_tombstone.c.modified_utc, table + TOMBSTONES_SUFFIX, watermarks
+		)
+		sql_result = connection.execution_options(
+			stream_results=True).execute(sql_select)
+		with open_file(self.get_filepath(table, TOMBSTONES_SUFFIX), 'w') \
+				as tombstones_file:
+			while True:
+				rows = sql_result.fetchmany(self.chunk_size)
+				if not rows:
+					break
+				tombstones_file.write(''.join('%s\n' % uid for uid, in rows))
+		sql_result.close()
+
+	def get_filepath(self, table: str, suffix: str = None) -> str:
+		"""
+		Return table file path (delta file in incremental mode,
+		tombstones file for suffix).
+		"""
+		filename = table + (DELTA_SUFFIX if self.incremental else '')
+		if suffix is not None:
+			return os.path.join(self.target_path, filename + suffix + (
+				GZIP_EXT if self.file_format.endswith(GZIP_EXT) else ''))
+		return os.path.join(
+			self.target_path, '%s.%s' % (filename, self.file_format))
 
 	def import_csv(self) -> None:
 		"""
-		Import data to database.
+		Import data to database (tables in foreign key order within
+		one connection, files are read and converted by workers
+		concurrently with writing, streamed by chunks with commit
+		per chunk, resumed after last committed row stored in progress file,
+		with deferred indexes and relaxed pragmas in bulk mode (indexes
+		dropped by interrupted bulk load are recreated first),
+		upserted by uid from delta files in incremental mode after rows
+		of tombstones files deleted in reverse foreign key order).
 		"""
 		metadata = sqlalchemy.MetaData()
 		metadata.bind = database.engine
-		for table in self.table_list:
-			sql_table = sqlalchemy.Table(table, metadata, autoload=True)
-			sql_insert = sql_table.insert()
-			with database.engine.connect() as connection:
-				csv_filepath = os.path.join(self.target_path, '%s.csv' % table)
-				with open(csv_filepath, 'r') as csv_file:
-					csv_dict_reader = csv.DictReader(csv_file)
-					connection.execute(
-						sql_insert, [cast_row_values(row) for row in csv_dict_reader]
-					)
-			print('Table "%s" imported from "%s"' % (table, csv_filepath))
-
-
-def cast_row_values(row: dict) -> dict:
-	"""
-	Cast row values (datetime).
-	"""
-	for key, value in row.items():
-		if len(value) == 0:
-			row[key] = None
-		elif value == 'True' or value == 'False':
-			row[key] = bool(value)
-		elif key.endswith('_utc') or key.endswith('_local'):
-			if len(value) == 26:
-				row[key] = datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S.%f')
-			elif len(value) == 19:
-				row[key] = datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
-	row['is_deleted'] = bool(row['deleted_utc'] is not None)
-	return row
+		sql_table_list = [
+			sqlalchemy.Table(table, metadata, autoload=True)
+			for table in self.table_list
+		]
+		sql_table_list = [
+			sql_table for sql_table in metadata.sorted_tables
+			if sql_table in sql_table_list
+		]
+		timings = {}
+		indexes_filepath = os.path.join(self.target_path, BULK_INDEXES_JSON)
+		with database.engine.connect() as connection:
+			recreate_indexes(connection, indexes_filepath)
+			bulk_load = BulkLoad(connection, sql_table_list, indexes_filepath) \
+				if self.bulk else None
+			if bulk_load is not None:
+				bulk_load.begin()
+			try:
+				if self.incremental: # Ids of deleted rows are reused by source
+					for sql_table in reversed(sql_table_list):
+						self.delete_tombstoned(connection, sql_table)
+				if self.workers > 1:
+					self.import_tables(connection, sql_table_list, timings)
+				else:
+					for sql_table in sql_table_list:
+						self.import_table(
+							connection, sql_table, timings, self.read_file(sql_table))
+			except:
+				if bulk_load is not None:
+					bulk_load.end(analyze=False)
+				raise
+			if bulk_load is not None:
+				bulk_load.end(analyze=True)
+		print_timings(sql_table_list, timings, 'imported')
+
+	def import_tables(self, connection, sql_table_list: list,
+										timings: dict) -> None:
+		"""
+		Import data to database tables (in list order) with files read
+		ahead by workers (SQLite serializes writers, so one connection writes).
+		"""
+		chunk_queues = [ChunkQueue() for sql_table in sql_table_list]
+		with ThreadPoolExecutor(self.workers) as executor:
+			try:
+				for sql_table, chunk_queue in zip(sql_table_list, chunk_queues):
+					executor.submit(chunk_queue.feed, self.read_file(sql_table))
+				for sql_table, chunk_queue in zip(sql_table_list, chunk_queues):
+					self.import_table(connection, sql_table, timings, chunk_queue)
+			finally:
+				for chunk_queue in chunk_queues:
+					chunk_queue.cancel()
+
+	def read_file(self, sql_table):
+		"""
+		Yield chunks of rows converted to dicts of values read from table file
+		(after committed rows stored in progress file).
+		"""
+		filepath = self.get_filepath(sql_table.name)
+		row_count = read_progress(filepath + PROGRESS_FILE_EXT)
+		with open_file(filepath, 'r') as import_file:
+			rows_reader, convert_row = get_rows_reader(
+				import_file, self.file_format, sql_table)
+			for rows in iterate_chunks(
+						itertools.islice(rows_reader, row_count, None),
+						self.chunk_size
+					):
+				yield [convert_row(row) for row in rows]
+
+	def import_table(self, connection, sql_table, timings: dict,
+									 chunks) -> None:
+		"""
+		Import chunks (iterable) of table rows to database table
+		with commit and progress file written per chunk.
+		"""
+		started = time.time()
+		table = sql_table.name
+		sql_insert = sql_table.insert()
+		upsert = self.incremental and 'uid' in sql_table.c
+		filepath = self.get_filepath(table)
+		progress_filepath = filepath + PROGRESS_FILE_EXT
+		row_count = read_progress(progress_filepath)
+		if row_count > 0:
+			logging.info('Table "%s": resumed after %d rows' % (table, row_count))
+		progress = Progress('Table "%s"' % table, 'imported', row_count)
+		for rows in chunks:
+			with connection.begin():
+				if upsert:
+					upsert_rows(connection, sql_table, rows)
+				else:
+					connection.execute(sql_insert, rows)
+			row_count += len(rows)
+			write_progress(progress_filepath, row_count)
+			progress.report(row_count)
+		progress.report(row_count, force=True)
+		if os.path.exists(progress_filepath):
+			os.remove(progress_filepath)
+		timings[table] = (row_count, time.time() - started)
+		print('Table "%s" imported from "%s" (%d rows)' % (
+			table, filepath, row_count))
+
+	def delete_tombstoned(self, connection, sql_table) -> None:
+		"""
+		Delete table rows of uids in tombstones file (hard deleted in source,
+		rows deleted already or exported again within overlap are skipped).
+		"""
+		tombstones_filepath = self.get_filepath(sql_table.name, TOMBSTONES_SUFFIX)
+		if 'uid' not in sql_table.c or not os.path.exists(tombstones_filepath):
+			return
+		deleted_count = 0
+		with open_file(tombstones_filepath, 'r') as tombstones_file:
+			uids = (line.rstrip('\n') for line in tombstones_file)
+			for chunk in iterate_chunks(uids, MAX_VARIABLES):
+				with connection.begin():
+					deleted_count += connection.execute(
+						sql_table.delete().where(sql_table.c.uid.in_(chunk))).rowcount
+		if deleted_count:
+			print('Table "%s": %d rows of "%s" deleted' % (
+				sql_table.name, deleted_count, tombstones_filepath))
+
+	def snapshot(self, filename: str) -> None:
+		"""
+		Copy database to snapshot file with SQLite online backup
+		(by pages with pauses between steps) and verify snapshot integrity.
+		"""
+		snapshot_filepath = os.path.join(self.target_path, filename)
+		os.makedirs(self.target_path, exist_ok=True)
+		temporary_filepath = snapshot_filepath + '.tmp'
+		started = time.time()
+		connection = get_sqlite_connection()
+		try:
+			snapshot_connection = sqlite3.connect(temporary_filepath)
+			try:
+				backup_sqlite(connection.connection, snapshot_connection, 'Snapshot')
+				verify_integrity(snapshot_connection)
+			finally:
+				snapshot_connection.close()
+		except:
+			if os.path.exists(temporary_filepath):
+				os.remove(temporary_filepath)
+			raise
+		finally:
+			connection.close()
+		os.replace(temporary_filepath, snapshot_filepath)
+		print('Database snapshot saved to "%s" in %.2fs' % (
+			snapshot_filepath, time.time() - started))
+
+	def restore(self, filename: str) -> None:
+		"""
+		Copy snapshot file to temporary file next to database with SQLite
+		online backup, verify its integrity and replace database with it
+		(application should be stopped, other connections keep reading
+		and writing replaced database file otherwise).
+		"""
+		snapshot_filepath = os.path.join(self.target_path, filename)
+		if not os.path.exists(snapshot_filepath):
+			raise FileNotFoundError(snapshot_filepath)
+		started = time.time()
+		get_sqlite_connection().close()
+		database_filepath = database.engine.url.database
+		database.engine.dispose()
+		temporary_filepath = database_filepath + '.restore'
+		snapshot_connection = sqlite3.connect(snapshot_filepath)
+		try:
+			temporary_connection = sqlite3.connect(temporary_filepath)
+			try:
+				backup_sqlite(
+					snapshot_connection, temporary_connection, 'Restore', pause=False)
+				verify_integrity(temporary_connection)
+			finally:
+				temporary_connection.close()
+		except:
+			if os.path.exists(temporary_filepath):
+				os.remove(temporary_filepath)
+			raise
+		finally:
+			snapshot_connection.close()
+		replace_sqlite(temporary_filepath, database_filepath)
+		print('Database restored from "%s" in %.2fs' % (
+			snapshot_filepath, time.time() - started))
+
+
+def print_timings(sql_table_list: list, timings: dict, action: str) -> None:
+	"""
+	Print timing summary (rows number, seconds and rate) by tables.
+	"""
+	for sql_table in sql_table_list:
+		if sql_table.name in timings:
+			row_count, seconds = timings[sql_table.name]
+			print('%-12s %10d rows %s in %8.2fs (%.0f rows/sec)' % (
+				sql_table.name, row_count, action, seconds,
+				row_count / max(seconds, 0.001)
+			))
+
+
+def upsert_rows(connection, sql_table, rows: list) -> None:
+	"""
+	Update rows existed (by uid) and insert new rows to table.
+	Ids (and foreign keys) are kept, so target should be replica of source,
+	ValueError is raised for row with id differed (or taken by other uid).
+	"""
+	existed_ids = {}
+	taken_uids = {}
+	for chunk in iterate_chunks(iter(rows), MAX_VARIABLES):
+		existed_ids.update(connection.execute(
+			sqlalchemy.sql.select(
+				[sql_table.c.uid, sql_table.c.id]
+			).where(
+				sql_table.c.uid.in_([row['uid'] for row in chunk])
+			)
+		).fetchall())
+		taken_uids.update(connection.execute(
+			sqlalchemy.sql.select(
+				[sql_table.c.id, sql_table.c.uid]
+			).where(
+				sql_table.c.id.in_([row['id'] for row in chunk])
+			)
+		).fetchall())
+	for row in rows:
+		if taken_uids.get(row['id'], row['uid']) != row['uid'] or \
+				existed_ids.get(row['uid'], row['id']) != row['id']:
+			raise ValueError(
+				'Table "%s": row "%s" (id %s) differs from database by id, '
+				'incremental import requires replica' % (
+					sql_table.name, row['uid'], row['id']))
+	insert_rows = [row for row in rows if row['uid'] not in existed_ids]
+	update_rows = [
+		{ 'b_%s' % key: value for key, value in row.items() }
+		for row in rows if row['uid'] in existed_ids
+	]
+	if insert_rows:
+		connection.execute(sql_table.insert(), insert_rows)
+	if update_rows:
+		connection.execute(
+			sql_table.update().where(
+				sql_table.c.uid == sqlalchemy.bindparam('b_uid')
+			).values({
+				key[2:]: sqlalchemy.bindparam(key)
+				for key in update_rows[0] if key not in ('b_id', 'b_uid')
+			}),
+			update_rows
+		)
+
+
+def filter_modified(connection, sql_select, modified_column, key: str,
+										watermarks: dict) -> object:
+	"""
+	Return select filtered by rows modified since watermark of key
+	(within overlap window below it) and move watermark forward
+	to last modified_utc of filtered rows.
+	"""
+	sql_max = sql_select.with_only_columns(
+		[sqlalchemy.func.max(modified_column)])
+	if watermarks.get(key) is not None:
+		watermark = _convert_datetime(watermarks[key])
+		sql_select = sql_select.where(modified_column > watermark - \
+			datetime.timedelta(seconds=WATERMARK_OVERLAP_SECONDS))
+		sql_max = sql_max.where(modified_column > watermark)
+	watermark = connection.execute(sql_max).scalar()
+	if watermark is not None:
+		watermarks[key] = str(watermark)
+	return sql_select
+
+
+def read_watermarks(watermark_filepath: str) -> dict:
+	"""
+	Return watermarks (last exported modified_utc by table) from file.
+	"""
+	if not os.path.exists(watermark_filepath):
+		return {}
+	with open(watermark_filepath, 'r') as watermark_file:
+		return json.load(watermark_file)
+
+
+def write_watermarks(watermark_filepath: str, watermarks: dict) -> None:
+	"""
+	Write watermarks (last exported modified_utc by table) to file.
+	"""
+	with open(watermark_filepath, 'w') as watermark_file:
+		json.dump(watermarks, watermark_file, indent=2, sort_keys=True)
+
+
+def write_indexes(indexes_filepath: str, indexes: list) -> None:
+	"""
+	Write indexes (name and SQL) dropped by bulk load to file
+	(flushed to disk before indexes are dropped).
+	"""
+	with open(indexes_filepath, 'w') as indexes_file:
+		json.dump(indexes, indexes_file, indent=2)
+		indexes_file.flush()
+		os.fsync(indexes_file.fileno())
+
+
+def recreate_indexes(connection, indexes_filepath: str) -> None:
+	"""
+	Recreate indexes (missed in database) stored by interrupted bulk load
+	and remove indexes file.
+	"""
+	if not os.path.exists(indexes_filepath):
+		return
+	with open(indexes_filepath, 'r') as indexes_file:
+		indexes = json.load(indexes_file)
+	existed = set(
+		name for name, in connection.execute(
+			'SELECT name FROM sqlite_master WHERE type = \'index\''
+		).fetchall()
+	)
+	missed = [(name, sql) for name, sql in indexes if name not in existed]
+	for name, sql in missed:
+		connection.execute(sql)
+	os.remove(indexes_filepath)
+	logging.info('Bulk load: %d indexes recreated after interruption' % (
+		len(missed)))
+
+
+def iterate_chunks(rows, chunk_size: int):
+	"""
+	Yield lists of rows (not more than chunk_size rows in each).
+	"""
+	while True:
+		chunk = list(itertools.islice(rows, chunk_size))
+		if not chunk:
+			return
+		yield chunk
+
+
+def read_progress(progress_filepath: str) -> int:
+	"""
+	Return committed rows number from progress file (0 if not exists).
+	"""
+	if not os.path.exists(progress_filepath):
+		return 0
+	with open(progress_filepath, 'r') as progress_file:
+		return int(progress_file.read().strip() or 0)
+
+
+def write_progress(progress_filepath: str, row_count: int) -> None:
+	"""
+	Write committed rows number to progress file.
+	"""
+	with open(progress_filepath, 'w') as progress_file:
+		progress_file.write(str(row_count))
+
+
+class ChunkQueue():
+	"""
+	This ChunkQueue class passes chunks of rows from producer thread
+	to consumer thread (not more than QUEUE_CHUNKS are buffered, producer
+	error is raised by consumer, cancelled queue stops both of them).
+	"""
+
+	def __init__(self) -> "ChunkQueue":
+		self.queue = queue.Queue(QUEUE_CHUNKS)
+		self.cancelled = threading.Event()
+
+	def feed(self, chunks) -> None:
+		"""
+		Put chunks (iterable) to queue and close queue
+		(with error raised by chunks, if any).
+		"""
+		try:
+			for chunk in chunks:
+				if not self.put((chunk, None)):
+					return
+		except Exception as error:
+			self.put((None, error))
+			return
+		self.put((None, None))
+
+	def put(self, item: tuple) -> bool:
+		"""
+		Put item (chunk and error) to queue waiting for free place
+		and return False if queue is cancelled.
+		"""
+		while not self.cancelled.is_set():
+			try:
+				self.queue.put(item, timeout=QUEUE_SECONDS)
+				return True
+			except queue.Full:
+				pass
+		return False
+
+	def consume(self, function, *args) -> object:
+		"""
+		Return result of function called with arguments and queue
+		(as chunks iterable) and cancel queue (producer is stopped on error).
+		"""
+		try:
+			return function(*args, self)
+		finally:
+			self.cancel()
+
+	def cancel(self) -> None:
+		"""
+		Cancel queue (blocked producer is stopped).
+		"""
+		self.cancelled.set()
+
+	def __iter__(self):
+		"""
+		Yield chunks put to queue until closed (producer error is raised).
+		"""
+		while True:
+			try:
+				chunk, error = self.queue.get(timeout=QUEUE_SECONDS)
+			except queue.Empty:
+				if self.cancelled.is_set():
+					raise RuntimeError('Chunk queue is cancelled')
+				continue
+			if error is not None:
+				raise error
+			if chunk is None:
+				return
+			yield chunk
+
+
+class Progress():
+	"""
+	This Progress class logs processed rows number and rate
+	(not more often than PROGRESS_SECONDS).
+	"""
+
+	def __init__(self, title: str, action: str,
+							 row_count: int = 0) -> "Progress":
+		self.title = title
+		self.action = action
+		self.initial_count = row_count
+		self.started = time.time()
+		self.reported = self.started
+
+	def report(self, row_count: int, force: bool = False) -> None:
+		now = time.time()
+		if force or now - self.reported >= PROGRESS_SECONDS:
+			self.reported = now
+			logging.info('%s: %d rows %s (%.0f rows/sec)' % (
+				self.title, row_count, self.action,
+				(row_count - self.initial_count) / max(now - self.started, 0.001)
+			))
+
+
+def get_sqlite_connection() -> object:
+	"""
+	Return raw (DB-API) connection to SQLite database.
+	"""
+	if database.engine.dialect.name != 'sqlite':
+		raise ValueError('Snapshot is supported for SQLite only')
+	return database.engine.raw_connection()
+
+
+def backup_sqlite(source, target, title: str, pause: bool = True) -> None:
+	"""
+	Copy source SQLite database to target by BACKUP_PAGES pages
+	with BACKUP_SLEEP pause between steps (writers are served in pauses)
+	or without pauses (target is not used by others).
+	"""
+	if not hasattr(source, 'backup'):
+		raise RuntimeError('SQLite online backup requires Python 3.7+')
+	reported = [time.time()]
+
+	def progress(status: int, remaining: int, total: int) -> None:
+		now = time.time()
+		if now - reported[0] >= PROGRESS_SECONDS:
+			reported[0] = now
+			logging.info('%s: %d of %d pages copied' % (
+				title, total - remaining, total))
+		if pause:
+			time.sleep(BACKUP_SLEEP)
+
+	source.backup(target, pages=BACKUP_PAGES, progress=progress)
+
+
+def replace_sqlite(source_filepath: str, target_filepath: str) -> None:
+	"""
+	Replace target SQLite database file with source one holding exclusive
+	lock of target (its journal files are removed not to be applied
+	to replaced database).
+	"""
+	connection = sqlite3.connect(target_filepath, timeout=BACKUP_TIMEOUT)
+	try:
+		connection.execute('BEGIN EXCLUSIVE')
+		for suffix in SQLITE_JOURNAL_SUFFIXES:
+			if os.path.exists(target_filepath + suffix):
+				os.remove(target_filepath + suffix)
+		os.replace(source_filepath, target_filepath)
+	finally:
+		connection.close()
+
+
+def verify_integrity(connection) -> None:
+	"""
+	Run SQLite integrity check and raise error if database is damaged.
+	"""
+	result = [row[0] for row in connection.execute('PRAGMA integrity_check')]
+	if result != ['ok']:
+		raise ValueError('Integrity check failed: %s' % '; '.join(result[:10]))
+
+
+def begin_snapshot(connection) -> object:
+	"""
+	Begin and return read transaction for connection to get consistent
+	snapshot (pysqlite defers BEGIN up to first modification,
+	so it is emitted explicitly for SQLite).
+	"""
+	if connection.dialect.name == 'sqlite':
+		connection.execute('BEGIN')
+		return _SQLiteTransaction(connection)
+	return connection.execution_options(
+		isolation_level='REPEATABLE READ').begin()
+
+
+class _SQLiteTransaction():
+	"""
+	This _SQLiteTransaction class ends explicitly begun SQLite transaction.
+	"""
+
+	def __init__(self, connection) -> "_SQLiteTransaction":
+		self.connection = connection
+
+	def rollback(self) -> None:
+		self.connection.execute('ROLLBACK')
+
+
+class BulkLoad():
+	"""
+	This BulkLoad class relaxes SQLite pragmas and drops non-unique indexes
+	of tables for bulk load, then restores them (supported for SQLite only,
+	dropped indexes are stored to file to be recreated after interruption).
+	"""
+
+	def __init__(self, connection, sql_table_list: list,
+							 indexes_filepath: str) -> "BulkLoad":
+		self.connection = connection
+		self.sql_table_list = sql_table_list
+		self.indexes_filepath = indexes_filepath
+		self.pragmas = {}
+		self.indexes = []
+
+	def begin(self) -> None:
+		"""
+		Store and relax pragmas, store (to file) and drop non-unique indexes.
+		"""
+		if self.connection.dialect.name != 'sqlite':
+			logging.warning('Bulk load is supported for SQLite only (skipped)')
+			return
+		for pragma, value in BULK_PRAGMAS:
+			self.pragmas[pragma] = \
+				self.connection.execute('PRAGMA %s' % pragma).scalar()
+			self.connection.execute('PRAGMA %s = %s' % (pragma, value))
+		for sql_table in self.sql_table_list:
+			for name, sql in self.connection.execute(
+						'SELECT name, sql FROM sqlite_master '
+						'WHERE type = \'index\' AND tbl_name = ? AND sql IS NOT NULL',
+						(sql_table.name,)
+					).fetchall():
+				if not sql.upper().startswith('CREATE UNIQUE'):
+					self.indexes += [ (name, sql) ]
+		if self.indexes:
+			write_indexes(self.indexes_filepath, self.indexes)
+		for name, sql in self.indexes:
+			self.connection.execute('DROP INDEX "%s"' % name)
+		logging.info('Bulk load: %d indexes dropped' % len(self.indexes))
+
+	def end(self, analyze: bool) -> None:
+		"""
+		Recreate dropped indexes (and remove indexes file),
+		restore pragmas and analyze on success.
+		"""
+		for name, sql in self.indexes:
+			self.connection.execute(sql)
+		if self.indexes:
+			os.remove(self.indexes_filepath)
+			logging.info('Bulk load: %d indexes recreated' % len(self.indexes))
+		self.indexes = []
+		for pragma, value in self.pragmas.items():
+			self.connection.execute('PRAGMA %s = %s' % (pragma, value))
+		self.pragmas = {}
+		if analyze and self.connection.dialect.name == 'sqlite':
+			self.connection.execute('ANALYZE')
+
+
+def open_file(filepath: str, mode: str) -> object:
+	"""
+	Return text file object opened for mode (gzip compressed by extension).
+	"""
+	if filepath.endswith(GZIP_EXT):
+		return gzip.open(filepath, mode + 't')
+	return open(filepath, mode)
+
+
+def get_rows_writer(export_file, file_format: str, sql_table, keys: list):
+	"""
+	Write header (CSV column names or JSON Lines schema) to file
+	and return function writing rows to file.
+	"""
+	if file_format.startswith('jsonl'):
+		export_file.write(json.dumps({
+			'schema': [
+				{
+					'name': key,
+					'type': str(sql_table.c[key].type),
+					'nullable': sql_table.c[key].nullable
+				} for key in keys
+			]
+		}) + '\n')
+		return lambda rows: export_file.write(''.join(
+			json.dumps(list(row), default=str) + '\n' for row in rows))
+	csv_writer = csv.writer(export_file)
+	csv_writer.writerow(keys)
+	return csv_writer.writerows
+
+
+def get_rows_reader(import_file, file_format: str, sql_table) -> tuple:
+	"""
+	Read header (CSV column names or JSON Lines schema) from file
+	and return rows iterator and function converting row to dict of values.
+	"""
+	if file_format.startswith('jsonl'):
+		schema = json.loads(next(import_file))['schema']
+		return (json.loads(line) for line in import_file), get_row_converter(
+			sql_table, [column['name'] for column in schema], typed=True)
+	csv_reader = csv.reader(import_file)
+	return csv_reader, get_row_converter(sql_table, next(csv_reader))
+
+
+def get_row_converter(sql_table, keys: list, typed: bool = False):
+	"""
+	Return function converting row (list of CSV strings or JSON values
+	if typed, ordered as keys) to dict of values typed by table columns
+	(reflected once per table).
+	"""
+	columns = [sql_table.c.get(key) for key in keys]
+	converters = [
+		(
+			index, key,
+			get_typed_value_converter(column) if typed else \
+				get_value_converter(column)
+		)
+		for index, (key, column) in enumerate(zip(keys, columns))
+		if column is not None
+	]
+	# Legacy is_deleted column is derived from deleted_utc
+	derive_is_deleted = 'is_deleted' in sql_table.c and \
+		'is_deleted' not in keys and 'deleted_utc' in keys
+
+	def convert(row: list) -> dict:
+		values = {
+			key: converter(row[index]) for index, key, converter in converters
+		}
+		if derive_is_deleted:
+			values['is_deleted'] = values['deleted_utc'] is not None
+		return values
+
+	return convert
+
+
+def get_value_converter(column) -> object:
+	"""
+	Return function converting CSV string to column value
+	(empty string is None for nullable columns).
+	"""
+	if isinstance(column.type, sqlalchemy.Boolean):
+		convert = _convert_boolean
+	elif isinstance(column.type, sqlalchemy.Integer):
+		convert = int
+	elif isinstance(column.type, sqlalchemy.DateTime):
+		convert = _convert_datetime
+	elif isinstance(column.type, sqlalchemy.Date):
+		convert = _convert_date
+	else:
+		convert = None
+	if not column.nullable:
+		return convert or str
+	if convert is None:
+		return lambda value: value if value else None
+	return lambda value: convert(value) if value else None
+
+
+def get_typed_value_converter(column) -> object:
+	"""
+	Return function converting JSON value to column value
+	(only dates and datetimes are parsed).
+	"""
+	if isinstance(column.type, sqlalchemy.DateTime):
+		convert = _convert_datetime
+	elif isinstance(column.type, sqlalchemy.Date):
+		convert = _convert_date
+	else:
+		return lambda value: value
+	return lambda value: None if value is None else convert(value)
+
+
+def _convert_boolean(value: str) -> bool:
+	"""
+	Return boolean value of CSV string ('True' or '1').
+	"""
+	return value == 'True' or value == '1'
+
+
+if hasattr(datetime.datetime, 'fromisoformat'):
+	_convert_datetime = datetime.datetime.fromisoformat
+	_convert_date = datetime.date.fromisoformat
+else:
+	def _convert_datetime(value: str) -> datetime.datetime:
+		"""
+		Return datetime value of CSV string (with or without microseconds).
+		"""
+		return datetime.datetime.strptime(
+			value, '%Y-%m-%d %H:%M:%S.%f' if len(value) > 19 else '%Y-%m-%d %H:%M:%S')
+
+	def _convert_date(value: str) -> datetime.date:
+		"""
+		Return date value of CSV string.
+		"""
+		return datetime.datetime.strptime(value, '%Y-%m-%d').date()
@@ -8,14 +8,30 @@ Module to handle identica plugin.
 import os
 import json
 import time
+import queue
+import signal
 import logging
 import secrets
 import string
-from datetime import datetime
-from datetime import timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Additional libraries import
 import requests
+from requests.adapters import HTTPAdapter
+
+# Application modules import
+from plugins.__outbox__ import enqueue
+from plugins.__outbox__ import dequeue
+from plugins.__outbox__ import complete
+from plugins.__outbox__ import fail
+from plugins.__outbox__ import get_metrics
+from plugins.__token__ import create_token
+from plugins.__token__ import read_token
+from plugins.__token__ import confirm_token
+from plugins.__token__ import consume_token
+from plugins.__token__ import wait_token
+from plugins.__token__ import purge_tokens
 
 # Application constants
 IDENTICA_PATH = os.path.dirname(__file__)
@@ -34,6 +50,8 @@ PWD_ALPHABET = string.ascii_uppercase + string.digits
 PWD_LENGTH = 6
 PWD_COUNT = 3
 VALID_SECONDS = 60
+TOKEN_URL = 'url'
+TOKEN_PIN = 'pin'
 LANGUAGES = ['en', 'ru']
 MESSAGES = [
 	{
@@ -77,7 +95,7 @@ for keyboard in KEYBOARDS:
 	for button in keyboard:
 		for key, value in button[0]['title'].items():
 			PSEUDO_COMMANDS[value] = button[0]['id']
-LOOP_TIMEOUT = 5
+LOOP_TIMEOUT = 5 # Delay after errors
 COMMANDS = [
 	{
 		'command': '/start',
@@ -85,6 +103,124 @@ COMMANDS = [
 	}
 ]
 REQUEST_TIMEOUT = (3.0, 15.0)
+POLL_SECONDS = 25 # Long-poll timeout of getUpdates
+POLL_TIMEOUT = (3.0, POLL_SECONDS + 10.0)
+UPDATE_WORKERS = 4
+SENDER_WORKERS = 4
+WORKER_QUEUE_SIZE = 100 # Receiver/handlers wait for queue space
+UPDATE_METRICS_SECONDS = 60
+STOP_SECONDS = 30 # Wait for workers to drain queues on stop
+OUTBOX_BATCH = 20
+OUTBOX_TIMEOUT = 0.5
+OUTBOX_METRICS_SECONDS = 60
+OUTBOX_MESSAGE = 'message'
+OUTBOX_SHARE = 'share'
+OUTBOX_WORKERS = 8
+GLOBAL_RATE = 30 # Messages per second (Bot API limit)
+CHAT_RATE = 1 # Messages per second for single chat (Bot API limit)
+
+
+class RateLimiter():
+	"""
+	This RateLimiter class describes thread-safe scheduling of sendings
+	by global and per-chat rate (messages per second).
+	"""
+
+	def __init__(self, global_rate: float, chat_rate: float) -> "RateLimiter":
+		"""
+		Initiate RateLimiter object with rates (zero rate means no limit).
+		"""
+		self.global_interval = 1.0 / global_rate if global_rate else 0
+		self.chat_interval = 1.0 / chat_rate if chat_rate else 0
+		self.global_next = 0
+		self.chat_next = {}
+		self.lock = threading.Lock()
+
+	def wait(self, chat_id: str = None) -> None:
+		"""
+		Reserve nearest sending slot for chat (global only for null)
+		and sleep until it comes.
+		"""
+		with self.lock:
+			now = time.time()
+			slot = max(now, self.global_next, self.chat_next.get(chat_id, 0))
+			self.global_next = slot + self.global_interval
+			if chat_id is not None:
+				self.chat_next[chat_id] = slot + self.chat_interval
+			if len(self.chat_next) > 1000: # Forget chats with passed slots
+				self.chat_next = {
+					key: value for key, value in self.chat_next.items() if value > now
+				}
+		if slot > now:
+			time.sleep(slot - now)
+
+
+class Workers():
+	"""
+	This Workers class describes pool of threads with own queues
+	(items with same key are handled in order by same thread).
+	"""
+
+	def __init__(self, target, count: int) -> "Workers":
+		"""
+		Initiate Workers object with target (called with item arguments)
+		and thread count.
+		"""
+		self.target = target
+		self.queues = [queue.Queue(WORKER_QUEUE_SIZE) for _ in range(count)]
+		self.threads = [
+			threading.Thread(target=self.run, args=(items,), daemon=True)
+			for items in self.queues
+		]
+		self.handled = 0
+		self.lock = threading.Lock()
+
+	def start(self) -> None:
+		"""
+		Start threads.
+		"""
+		for thread in self.threads:
+			thread.start()
+
+	def put(self, key, item: tuple) -> None:
+		"""
+		Put item (target arguments) to queue of thread selected by key.
+		"""
+		self.queues[hash(key) % len(self.queues)].put(item)
+
+	def run(self, items: queue.Queue) -> None:
+		"""
+		Run loop to handle queue items until null item.
+		"""
+		while True:
+			item = items.get()
+			if item is None:
+				return
+			try:
+				self.target(*item)
+			except:
+				logging.error('Error while handling item', exc_info=1)
+			with self.lock:
+				self.handled += 1
+
+	def stop(self, timeout: float) -> None:
+		"""
+		Stop threads after queued items are handled (wait up to timeout).
+		"""
+		for items in self.queues:
+			items.put(None)
+		stop_time = time.time() + timeout
+		for thread in self.threads:
+			thread.join(max(0, stop_time - time.time()))
+
+	def get_metrics(self) -> dict:
+		"""
+		Return handled and queued item numbers.
+		"""
+		return {
+			'handled': self.handled,
+			'queued': sum(items.qsize() for items in self.queues)
+		}
 
 
 class Plugin():
@@ -96,32 +232,43 @@ class Plugin():
 	config_filename = None
 	config = None
 	offset = 0
+	session = None
+	limiter = None
+	stopping = None
+	handlers = None
+	sender = None
 
-	def __init__(self, domain_url: str = None) -> "Plugin":
+	def __init__(self, domain_url: str = None,
+							 config: dict = None) -> "Plugin":
 		"""
 		Inititate Plugin object with debug_mode and
-		configuration data.
+		configuration data (read out from file if not defined).
 		"""
 		self.config_filename = os.path.join(IDENTICA_PATH, IDENTICA_JSON)
 		self.domain_url = domain_url
-		if not self.init_config():
+		self.stopping = threading.Event()
+		if not self.init_config(config):
 			raise ValueError('Initiate Error!')
 		logging.debug('Identica initiated')
 
-	def init_config(self) -> bool:
+	def init_config(self, config: dict = None) -> bool:
 		"""
-		Initiate configuration.
+		Initiate configuration (read out from file if not defined).
 		"""
-		# Read out configuration from file
-		if not os.path.isfile(self.config_filename):
-			logging.error('Configuration not found!')
-			return
-		with open(self.config_filename, 'r') as file:
-			self.config = json.loads(file.read())
-		with open(self.config_filename, 'w') as file:
-			file.write('')
-		os.remove(self.config_filename)
+		if config is not None:
+			self.config = config
+		else:
+			# Read out configuration from file
+			if not os.path.isfile(self.config_filename):
+				logging.error('Configuration not found!')
+				return
+			with open(self.config_filename, 'r') as file:
+				self.config = json.loads(file.read())
+			with open(self.config_filename, 'w') as file:
+				file.write('')
+			os.remove(self.config_filename)
 		self.config['website_marker'] = '[ %s ]' % self.config['website']
+		self.init_session()
 		# Initiate configuration
 		self.config['bot_url']['setMyCommands'] = \
 			self.config['bot_url']['setMyCommands'] % self.config['token']
@@ -142,7 +289,7 @@ class Plugin():
 			self.config['auth_url'] = \
 				'/'.join([self.domain_url] + self.config['auth_url'].split('/')[3:])
 		# Initiate update message (ignore previous)
-		response = requests.get(
+		response = self.session.get(
 			self.config['bot_url']['getUpdates'] % (-1, 1),
 			timeout=REQUEST_TIMEOUT
 		)
@@ -162,90 +309,228 @@ class Plugin():
 		logging.debug('Identica configuration initiated')
 		return True
 
+	def init_session(self) -> None:
+		"""
+		Initiate pooled (keep-alive) HTTP session and rate limiter
+		(optional configuration: outbox workers, global_rate and chat_rate).
+		Session is shared by handler, sender and outbox workers and receiver,
+		so pool keeps connection for each of them.
+		"""
+		outbox = self.config.get('outbox', {})
+		pool_size = UPDATE_WORKERS + SENDER_WORKERS + \
+			outbox.get('workers', OUTBOX_WORKERS) + 1
+		self.session = requests.Session()
+		self.session.mount(
+			'https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+		self.session.mount(
+			'http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+		self.limiter = RateLimiter(
+			outbox.get('global_rate', GLOBAL_RATE),
+			outbox.get('chat_rate', CHAT_RATE)
+		)
+
 	def run(self) -> None:
 		"""
-		Run infinite loop to manage communication through files in folder.
+		Run long-poll receiver (this thread) dispatching updates to handler
+		workers, sender workers (replies) and outbox loop (notifications)
+		until interrupted (SIGINT/SIGTERM), then stop them gracefully.
 		"""
+		if threading.current_thread() is threading.main_thread():
+			signal.signal(signal.SIGTERM, signal.default_int_handler)
+		self.enqueue_files()
+		self.handlers = Workers(self.handle_update, UPDATE_WORKERS)
+		self.sender = Workers(self.send_reply, SENDER_WORKERS)
+		self.handlers.start()
+		self.sender.start()
+		outbox = threading.Thread(target=self.run_outbox, daemon=True)
+		outbox.start()
+		logging.debug('Identica start main loop')
 		try:
-			result = True
-			logging.debug('Identica start main loop')
-			while True:
-				try:
-					if not result and os.path.isfile(self.config_filename):
-						self.init_config() # Read config if read not True
-						result = True
-					response = requests.get(
-						self.config['bot_url']['getUpdates'] % (self.offset, 25),
-						timeout=REQUEST_TIMEOUT
-					)
-					if not response.json()['ok']:
-						logging.error('Get updates error (offset = %d): %s' % \
-													(self.offset, response.json()))
-						result = False
-						continue
-					for item in response.json()['result']:
-						# Define offset for updates
-						if self.offset <= item['update_id']:
-							self.offset = item['update_id'] + 1
-						# Handle updates (message or callback)
-						if item.get('message'):
-							if not self.handle_message(item['message']):
-								result = False
-						elif item.get('callback_query'):
-							if not self.handle_callback(item['callback_query']):
-								result = False
-					# List message files to send messages (and document/photo)
-					mtime = time.time()
-					for filename in os.listdir(IDENTICA_PATH):
-						if filename.endswith(MSG_FILE_EXT):
-							with open(os.path.join(IDENTICA_PATH, filename), 'r') as file:
-								msg_data = json.loads(file.read())
-								response = requests.get(
-									self.config['bot_url']['sendMessage'],
-									json=msg_data, timeout=REQUEST_TIMEOUT
-								)
-								if not response.json()['ok']:
-									logging.error(response.json())
-									result = False
-							os.remove(os.path.join(IDENTICA_PATH, filename))
-						elif (filename.endswith(URL_FILE_EXT) or \
-								filename.endswith(PIN_FILE_EXT)):
-							filepath = os.path.join(IDENTICA_PATH, filename)
-							if mtime - os.path.getmtime(filepath) > VALID_SECONDS:
-								os.remove(os.path.join(IDENTICA_PATH, filename))
-						elif filename.endswith(SHR_FILE_EXT):
-							with open(os.path.join(IDENTICA_PATH, filename), 'r') as shr_file:
-								shr_data = json.loads(shr_file.read())
-								with open(shr_data['filepath'], 'rb') as file:
-									file_ext = shr_data['filename'].split('.')[-1].upper()
-									if file_ext == 'JPG' or file_ext == 'JPEG' or \
-											file_ext == 'PNG' or file_ext == 'GIF':
-										uri = self.config['bot_url']['sendPhoto']
-										files = { 'photo': file }
-									elif file_ext == 'TXT' or file_ext == 'CSV' or \
-											file_ext == 'PDF' or file_ext == 'ZIP':
-										uri = self.config['bot_url']['sendDocument']
-										files = { 'document': file }
-									response = requests.get(
-										uri, files=files,
-										params={
-											'chat_id': shr_data['chat_id'],
-											'caption': shr_data['filename']
-										},
-										timeout=REQUEST_TIMEOUT
-									)
-									if not response.json()['ok']:
-										logging.error(response.json())
-										result = False
-							os.remove(os.path.join(IDENTICA_PATH, filename))
-				except KeyboardInterrupt:
-					break
-				except:
-					logging.error('Error while running', exc_info=1)
-				time.sleep(LOOP_TIMEOUT) # Prevent overhead
+			self.receive_updates()
 		except KeyboardInterrupt:
 			pass
 		logging.debug('Identica stop main loop')
+		self.stopping.set()
+		self.handlers.stop(STOP_SECONDS) # Handlers put replies to sender
+		self.sender.stop(STOP_SECONDS)
+		outbox.join(STOP_SECONDS)
+		logging.info('Update metrics: handlers %s, sender %s' % (
+			self.handlers.get_metrics(), self.sender.get_metrics()))
+
+	def stop(self) -> None:
+		"""
+		Stop run after current long polling (run from other thread).
+		"""
+		self.stopping.set()
+
+	def receive_updates(self) -> None:
+		"""
+		Run loop to receive updates (long polling) until stop and put them
+		to handlers (by user to keep order) and log update metrics.
+		"""
+		result = True
+		received = 0
+		reported = time.time()
+		while not self.stopping.is_set():
+			try:
+				if not result and os.path.isfile(self.config_filename):
+					self.init_config() # Read config if read not True
+					result = True
+				response = self.session.get(
+					self.config['bot_url']['getUpdates'] % (self.offset, POLL_SECONDS),
+					timeout=POLL_TIMEOUT
+				)
+				if not response.json()['ok']:
+					logging.error('Get updates error (offset = %d): %s' % \
+												(self.offset, response.json()))
+					result = False
+					time.sleep(LOOP_TIMEOUT)
+					continue
+				for item in response.json()['result']:
+					# Define offset for updates
+					if self.offset <= item['update_id']:
+						self.offset = item['update_id'] + 1
+					update = item.get('message') or item.get('callback_query') or {}
+					self.handlers.put(update.get('from', {}).get('id'), (item,))
+					received += 1
+				purge_tokens() # Remove expired url tokens and pins
+				if time.time() - reported >= UPDATE_METRICS_SECONDS:
+					logging.info('Update metrics: %d received, %.1f per second, %s' % (
+						received, received / (time.time() - reported),
+						self.handlers.get_metrics()
+					))
+					received = 0
+					reported = time.time()
+			except KeyboardInterrupt:
+				raise
+			except:
+				logging.error('Error while running', exc_info=1)
+				time.sleep(LOOP_TIMEOUT) # Prevent overhead
+
+	def handle_update(self, item: dict) -> None:
+		"""
+		Handle update (message or callback) within handler worker.
+		"""
+		if item.get('message'):
+			self.handle_message(item['message'])
+		elif item.get('callback_query'):
+			self.handle_callback(item['callback_query'])
+
+	def reply(self, chat_id: str, method: str, data: dict) -> None:
+		"""
+		Put reply (bot method and JSON data) to sender (by chat to keep order).
+		"""
+		self.sender.put(chat_id, (method, data))
+
+	def send_reply(self, method: str, data: dict) -> None:
+		"""
+		Send reply within global rate limit (sender worker).
+		"""
+		self.limiter.wait()
+		response = self.session.get(
+			self.config['bot_url'][method], json=data, timeout=REQUEST_TIMEOUT
+		).json()
+		if not response['ok']:
+			logging.error(response)
+
+	def run_outbox(self) -> None:
+		"""
+		Run infinite loop to drain outbox (send messages and documents/photos
+		concurrently within rate limits) with retries on errors
+		and log outbox metrics.
+		"""
+		logging.debug('Identica start outbox loop')
+		executor = ThreadPoolExecutor(
+			self.config.get('outbox', {}).get('workers', OUTBOX_WORKERS))
+		reported = time.time()
+		while not self.stopping.is_set():
+			try:
+				items = dequeue(OUTBOX_BATCH)
+				# Send batch concurrently and mark items within this thread
+				# (waiting for batch keeps claims within CLAIM_SECONDS)
+				for item, error in zip(
+							items, executor.map(self.deliver_outbox_item, items)
+						):
+					if error is None:
+						complete(item[0])
+					else:
+						fail(item[0], item[3], error)
+				if time.time() - reported >= OUTBOX_METRICS_SECONDS:
+					reported = time.time()
+					logging.info('Outbox metrics: %s' % get_metrics())
+				if not items:
+					self.stopping.wait(OUTBOX_TIMEOUT)
+			except:
+				logging.error('Error while draining outbox', exc_info=1)
+				self.stopping.wait(OUTBOX_TIMEOUT)
+		executor.shutdown()
+		logging.debug('Identica stop outbox loop')
+
+	def deliver_outbox_item(self, item: tuple) -> str:
+		"""
+		Send outbox item (id, kind, data, attempts) within rate limits
+		and return error or null on success (outbox worker).
+		"""
+		_, kind, data, _ = item
+		try:
+			self.limiter.wait(data['chat_id'])
+			response = self.send_outbox_item(kind, data)
+			if response.get('ok'):
+				return
+			logging.error(response)
+			return json.dumps(response)
+		except:
+			logging.error('Error while sending outbox item', exc_info=1)
+			return 'Sending error'
+
+	def send_outbox_item(self, kind: str, data: dict) -> dict:
+		"""
+		Send outbox item (message or shared document/photo)
+		and return response dictionary.
+		"""
+		if kind == OUTBOX_MESSAGE:
+			return self.session.get(
+				self.config['bot_url']['sendMessage'],
+				json=data, timeout=REQUEST_TIMEOUT
+			).json()
+		file_ext = data['filename'].split('.')[-1].upper()
+		if file_ext == 'JPG' or file_ext == 'JPEG' or \
+				file_ext == 'PNG' or file_ext == 'GIF':
+			uri = self.config['bot_url']['sendPhoto']
+			field = 'photo'
+		elif file_ext == 'TXT' or file_ext == 'CSV' or \
+				file_ext == 'PDF' or file_ext == 'ZIP':
+			uri = self.config['bot_url']['sendDocument']
+			field = 'document'
+		else:
+			return { 'ok': False, 'description': 'Unsupported file type' }
+		with open(data['filepath'], 'rb') as file:
+			return self.session.get(
+				uri, files={ field: file },
+				params={
+					'chat_id': data['chat_id'],
+					'caption': data['filename']
+				},
+				timeout=REQUEST_TIMEOUT
+			).json()
+
+	def enqueue_files(self) -> None:
+		"""
+		Move message/share files (left by previous version) to outbox
+		and remove url/pin files (replaced by token store).
+		"""
+		for filename in os.listdir(IDENTICA_PATH):
+			if filename.endswith(URL_FILE_EXT) or filename.endswith(PIN_FILE_EXT):
+				os.remove(os.path.join(IDENTICA_PATH, filename))
+				continue
+			for file_ext, kind in (
+						(MSG_FILE_EXT, OUTBOX_MESSAGE), (SHR_FILE_EXT, OUTBOX_SHARE)
+					):
+				if filename.endswith(file_ext):
+					filepath = os.path.join(IDENTICA_PATH, filename)
+					with open(filepath, 'r', encoding='utf8') as file:
+						enqueue(kind, json.loads(file.read()))
+					os.remove(filepath)
 
 	def handle_message(self, message: dict) -> bool:
 		"""
@@ -260,7 +545,7 @@ class Plugin():
 		language = message['from'].get('language_code') \
 			if message['from'].get('language_code') in LANGUAGES else 'en'
 		if message['text'] == '/start':
-			response = self.send_keyboard(
+			self.send_keyboard(
 				message['chat']['id'],
 				language, KEYBOARDS[0], False
 			)
@@ -277,48 +562,33 @@ class Plugin():
 					secrets.choice(URL_TOKEN_ALPHABET) \
 					for _ in range(URL_TOKEN_LENGTH)
 				)
-				url_filename = os.path.join(
-					IDENTICA_PATH, url_token + URL_FILE_EXT)
-				with open(url_filename, 'w') as file:
-					file.write(json.dumps({
-						'from': message['from'],
-						'valid': (
-							datetime.utcnow() + timedelta(seconds=VALID_SECONDS)
-						).timestamp()
-					}))
-				response = self.send_url(
+				create_token(
+					TOKEN_URL, url_token, { 'from': message['from'] }, VALID_SECONDS)
+				self.send_url(
 					message['chat']['id'], MESSAGES[1][language],
 					self.config['auth_url'] % url_token
 				)
 			elif pseudo_command == '/auth_pin':
-				pin = ''.join(
-					secrets.choice(PIN_ALPHABET) \
-					for _ in range(PIN_LENGTH)
-				)
 				passwords = [
 					''.join(
 						secrets.choice(PWD_ALPHABET) \
 						for _ in range(PWD_LENGTH)
 					) for _ in range(PWD_COUNT)
 				]
-				pin_filename = os.path.join(
-					IDENTICA_PATH, pin + PIN_FILE_EXT)
-				with open(pin_filename, 'w') as file:
-					file.write(json.dumps({
-						'from': message['from'],
-						'password': secrets.choice(passwords),
-						'confirmed': False,
-						'valid': (
-							datetime.utcnow() + timedelta(seconds=VALID_SECONDS)
-						).timestamp()
-					}))
-				response = self.send_pin(
+				while True: # Generate pin until unique among valid ones
+					pin = ''.join(
+						secrets.choice(PIN_ALPHABET) \
+						for _ in range(PIN_LENGTH)
+					)
+					if create_token(
+								TOKEN_PIN, pin, { 'from': message['from'] },
+								VALID_SECONDS, secrets.choice(passwords)
+							):
+						break
+				self.send_pin(
 					message['chat']['id'], MESSAGES[2][language],
 					pin, passwords
 				)
-		if not response['ok']:
-			logging.error(response)
-			return False
 		return True
 
 	def handle_callback(self, callback: dict) -> bool:
@@ -336,49 +606,30 @@ class Plugin():
 		if callback['data'].endswith(self.config['website_marker']):
 			pin_password, _ = callback['data'].split('\n')
 			pin, password = pin_password.split(' ')
-			pin_filename = os.path.join(
-				IDENTICA_PATH, pin + PIN_FILE_EXT)
-			confirmation_message = 'Fail'
-			if os.path.isfile(pin_filename):
-				with open(pin_filename, 'r') as file:
-					pin_data = json.loads(file.read())
-				if pin_data['password'] == password and \
-						pin_data['valid'] > datetime.utcnow().timestamp():
-					pin_data['confirmed'] = True
-					confirmation_message = 'Success'
-					with open(pin_filename, 'w') as file:
-						file.write(json.dumps(pin_data))
-				else:
-					os.remove(pin_filename)
-			response = requests.get(
-				self.config['bot_url']['answerCallbackQuery'],
-				json={
+			confirmation_message = 'Success' \
+				if confirm_token(TOKEN_PIN, pin, password) else 'Fail'
+			chat_id = callback['message']['chat']['id']
+			self.reply(
+				chat_id, 'answerCallbackQuery',
+				{
 					'callback_query_id': callback['id'],
 					'text': confirmation_message
-				},
-				timeout=REQUEST_TIMEOUT
+				}
 			)
-			response = requests.get(
-				self.config['bot_url']['sendMessage'],
-				json={
-					'chat_id': callback['message']['chat']['id'],
+			self.reply(
+				chat_id, 'sendMessage',
+				{
+					'chat_id': chat_id,
 					'text': MESSAGES[0][language],
-				},
-				timeout=REQUEST_TIMEOUT
+				}
 			)
-			return True
-		else: # Ignore other callbacks
-			return True
-		if not response['ok']:
-			logging.error(response)
-			return False
 		return True
 
 	def set_commands(self) -> dict:
 		"""
 		Set commands and return response dictionary.
 		"""
-		return requests.get(
+		return self.session.get(
 			self.config['bot_url']['setMyCommands'],
 			json={ 'commands': COMMANDS },
 			timeout=REQUEST_TIMEOUT
@@ -386,16 +637,16 @@ class Plugin():
 
 	def send_keyboard(self, chat_id: str,
 										language: str, keyboard: list,
-										use_website: bool = True) -> dict:
+										use_website: bool = True) -> None:
 		"""
 		Send keyboard to user within chat message
-		and return response dictionary.
+		(through sender).
 		"""
 		marker = self.config['website_marker'] \
 			if use_website else '[ %s ]' % self.config['name']
-		return requests.get(
-			self.config['bot_url']['sendMessage'],
-			json={
+		self.reply(
+			chat_id, 'sendMessage',
+			{
 				'chat_id': chat_id,
 				'text': MESSAGES[0][language],
 				'reply_markup':{
@@ -407,42 +658,40 @@ class Plugin():
 						] for button in keyboard
 					]
 				}
-			},
-			timeout=REQUEST_TIMEOUT
-		).json()
+			}
+		)
 
 	def send_callback(self, chat_id: str, message: str,
-							 			options: list) -> dict:
+							 			options: list) -> None:
 		"""
 		Send website link button to user within chat message
-		and return response dictionary.
+		(through sender).
 		"""
 		inline_keyboard = [
 			[
 				{ 'text': option, 'callback_data': option }
 			] for option in options
 		]
-		return requests.get(
-			self.config['bot_url']['sendMessage'],
-			json={
+		self.reply(
+			chat_id, 'sendMessage',
+			{
 				'chat_id': chat_id,
 				'text': message,
 				'reply_markup':{
 					'inline_keyboard': inline_keyboard
 				}
-			},
-			timeout=REQUEST_TIMEOUT
-		).json()
+			}
+		)
 
 	def send_url(self, chat_id: str, message: str,
-							 url: str) -> dict:
+							 url: str) -> None:
 		"""
 		Send website link button to user within chat message
-		and return response dictionary.
+		(through sender).
 		"""
-		return requests.get(
-			self.config['bot_url']['sendMessage'],
-			json={
+		self.reply(
+			chat_id, 'sendMessage',
+			{
 				'chat_id': chat_id,
 				'text': message,
 				'reply_markup':{
@@ -452,24 +701,22 @@ class Plugin():
 						]
 					]
 				}
-			},
-			timeout=REQUEST_TIMEOUT
-		).json()
+			}
+		)
 
 	def send_pin(self, chat_id: str, message: str,
-							 pin: str, passwords: list) -> dict:
+							 pin: str, passwords: list) -> None:
 		"""
 		Send pin to user within chat message
-		and return response dictionary.
+		(through sender).
 		"""
-		requests.get(
-			self.config['bot_url']['sendMessage'],
-			json={
+		self.reply(
+			chat_id, 'sendMessage',
+			{
 				'chat_id': chat_id,
 				'text': 'PIN: <code>%s</code>' % pin,
 				'parse_mode': 'HTML'
-			},
-			timeout=REQUEST_TIMEOUT
+			}
 		)
 		inline_keyboard = [
 			[
@@ -480,111 +727,77 @@ class Plugin():
 				}
 			] for password in passwords
 		]
-		return requests.get(
-			self.config['bot_url']['sendMessage'],
-			json={
+		self.reply(
+			chat_id, 'sendMessage',
+			{
 				'chat_id': chat_id,
 				'text': message,
 				'reply_markup':{
 					'inline_keyboard': inline_keyboard
 				}
-			},
-			timeout=REQUEST_TIMEOUT
-		).json()
+			}
+		)
 
 	@staticmethod
 	def verify_url(url_token: str) -> dict:
 		"""
 		Return dictionary with user data or return null.
 		"""
-		url_filename = os.path.join(
-			IDENTICA_PATH, url_token + URL_FILE_EXT)
-		if not os.path.isfile(url_filename):
-			logging.warning('URL file not found: %s' % url_filename)
-			return
-		with open(url_filename, 'r') as file:
-			url_data = json.loads(file.read())
-		if url_data['valid'] < datetime.utcnow().timestamp():
-			logging.warning('URL invalid: %s' % url_filename)
+		url = consume_token(TOKEN_URL, url_token)
+		if url is None:
+			logging.warning('URL token invalid: %s' % url_token)
 			return
-		os.remove(url_filename)
-		return { 'from': url_data['from'] }
+		return { 'from': url[0]['from'] }
 
 	@staticmethod
 	def get_password(pin: str) -> str:
 		"""
 		Return password for pin or return null.
 		"""
-		pin_filename = os.path.join(
-			IDENTICA_PATH, pin + PIN_FILE_EXT)
-		if not os.path.isfile(pin_filename):
-			logging.warning('PIN file not found: %s' % pin_filename)
+		pin_data = read_token(TOKEN_PIN, pin)
+		if pin_data is None:
+			logging.warning('PIN invalid: %s' % pin)
 			return
-		with open(pin_filename, 'r') as file:
-			pin_data = json.loads(file.read())
-		if pin_data['valid'] < datetime.utcnow().timestamp():
-			logging.warning('PIN invalid: %s' % pin_filename)
-			return
-		return pin_data['password']
+		return pin_data[1]
 
 	@staticmethod
 	def verify_pin(pin: str) -> dict:
 		"""
 		Return dictionary with user data or return null.
 		"""
-		pin_filename = os.path.join(
-			IDENTICA_PATH, pin + PIN_FILE_EXT)
-		if not os.path.isfile(pin_filename):
-			logging.warning('PIN file not found: %s' % pin_filename)
-			return
-		with open(pin_filename, 'r') as file:
-			pin_data = json.loads(file.read())
-		if pin_data['valid'] < datetime.utcnow().timestamp():
-			logging.warning('PIN invalid: %s' % pin_filename)
-			os.remove(pin_filename)
+		pin_data = consume_token(TOKEN_PIN, pin, confirmed_only=True)
+		if pin_data is None:
+			logging.warning('PIN invalid: %s' % pin)
 			return
-		if not pin_data['confirmed']:
-			logging.warning('PIN not confirmed: %s' % pin_filename)
+		if not pin_data[1]:
+			logging.warning('PIN not confirmed: %s' % pin)
 			return {}
-		os.remove(pin_filename)
-		return { 'from': pin_data['from'] }
+		return { 'from': pin_data[0]['from'] }
+
+	@staticmethod
+	def wait_pin(pin: str, timeout: float) -> bool:
+		"""
+		Wait (up to timeout seconds) for pin confirmation and return True
+		(confirmed), False (not confirmed yet) or return null (pin invalid).
+		"""
+		pin_data = wait_token(TOKEN_PIN, pin, timeout)
+		if pin_data is None:
+			return
+		return pin_data[2]
 
 	@staticmethod
 	def notify_user(chat_id: str, text: str) -> None:
 		"""
-		Send notification message.
+		Send notification message (through outbox).
 		"""
-		msg_filename = os.path.join(
-			IDENTICA_PATH,
-			''.join(
-				secrets.choice(PWD_ALPHABET) \
-				for _ in range(PWD_LENGTH)
-			) + MSG_FILE_EXT
-		)
-		with open(msg_filename, 'w', encoding='utf8') as file:
-			file.write(
-				json.dumps(
-					{ 'chat_id': chat_id, 'text': text },
-					ensure_ascii=False
-				)
-			)
+		enqueue(OUTBOX_MESSAGE, { 'chat_id': chat_id, 'text': text })
 
 	@staticmethod
 	def share_with_user(chat_id: str, filename: str, filepath: str) -> None:
 		"""
-		Send file (photo/document) within chat.
+		Send file (photo/document) within chat (through outbox).
 		"""
-		shr_filename = os.path.join(
-			IDENTICA_PATH,
-			''.join(
-				secrets.choice(PWD_ALPHABET) \
-				for _ in range(PWD_LENGTH)
-			) + SHR_FILE_EXT
+		enqueue(
+			OUTBOX_SHARE,
+			{ 'chat_id': chat_id, 'filename': filename, 'filepath': filepath }
 		)
-		with open(shr_filename, 'w', encoding='utf8') as file:
-			file.write(
-				json.dumps(
-					{ 'chat_id': chat_id, 'filename': filename, 'filepath': filepath },
-					ensure_ascii=False
-				)
-			)